@@ -0,0 +1,337 @@
+"""
+Adaptive batch sizing and concurrency control for Gemini calls
+
+Concurrency follows AIMD: it grows by roughly one slot per round of
+successful calls and halves on a rate-limit (429) response. Batch size
+hill-climbs over powers of two on measured resumes-per-second, is capped
+by the observed tokens per resume, and shrinks on timeouts or persistent
+rate limits. Learned settings are persisted per model and reused by
+later runs.
+
+A run fixes its batch boundaries when it starts, so the same resumes
+and settings always produce the same batch prompts. Identical requests
+from concurrent runs can then be coalesced. Calls answered by the
+coalescing layer do not count as measurements.
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Callable, Any, Optional, Tuple
+from gemini_analysis import estimate_tokens
+
+STATE_DIR = os.getenv(
+    "ADAPTIVE_STATE_DIR", os.path.join(tempfile.gettempdir(), "resume_screener_adaptive")
+)
+MAX_CONCURRENCY = int(os.getenv("ADAPTIVE_MAX_CONCURRENCY", "8"))
+MAX_BATCH_SIZE = int(os.getenv("ADAPTIVE_MAX_BATCH_SIZE", "50"))
+MAX_PROMPT_TOKENS = int(os.getenv("ADAPTIVE_MAX_PROMPT_TOKENS", "30000"))
+MAX_RETRIES = 4
+
+# Successful calls at one batch size before comparing its throughput
+ADJUST_EVERY = 3
+EWMA_ALPHA = 0.3
+BACKOFF_SECONDS = 2.0
+
+_controllers: Dict[str, "AdaptiveController"] = {}
+_controllers_lock = threading.Lock()
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Check whether an exception is a quota / rate-limit (HTTP 429) error
+
+    Args:
+        error: Exception raised by a model call
+
+    Returns:
+        True for rate-limit errors
+    """
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    message = str(error).lower()
+    return "429" in message or "resource exhausted" in message or "rate limit" in message
+
+
+def _power_of_two(size: int) -> int:
+    """Largest power of two not above size (at least 1)"""
+    return 1 << (max(1, int(size)).bit_length() - 1)
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * previous
+
+
+class AdaptiveController:
+    """Per-model AIMD concurrency limit and hill-climbing batch size"""
+
+    def __init__(self, model_name: str, initial_batch_size: int = 10, initial_concurrency: int = 2,
+                 state_dir: Optional[str] = None):
+        self.model_name = model_name
+        self.state_path = os.path.join(state_dir or STATE_DIR, f"{model_name.replace('/', '_')}.json")
+        self.max_concurrency = MAX_CONCURRENCY
+        self.concurrency = float(min(initial_concurrency, MAX_CONCURRENCY))
+        self.batch_size = _power_of_two(min(initial_batch_size, MAX_BATCH_SIZE))
+
+        self.in_flight = 0
+        self.backoff_until = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.latency_s: Optional[float] = None
+        self.tokens_per_resume: Optional[float] = None
+        self.throughput: Dict[int, float] = {}
+
+        self._direction = 1
+        self._calls_at_size = 0
+        self._previous_size: Optional[int] = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Restore learned settings for this model, if any"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return
+        self.concurrency = float(min(max(1.0, state.get("concurrency", self.concurrency)), self.max_concurrency))
+        self.batch_size = _power_of_two(min(int(state.get("batch_size", self.batch_size)), MAX_BATCH_SIZE))
+        self.tokens_per_resume = state.get("tokens_per_resume")
+        self.latency_s = state.get("latency_s")
+
+    def save(self):
+        """Persist learned settings for this model"""
+        with self._lock:
+            state = self.snapshot(locked=True)
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_path), suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as state_file:
+                json.dump(state, state_file)
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            pass
+
+    def snapshot(self, locked: bool = False) -> Dict:
+        """
+        Current learned settings and counters
+
+        Returns:
+            Dictionary suitable for display or persistence
+        """
+        if not locked:
+            with self._lock:
+                return self.snapshot(locked=True)
+        return {
+            "model": self.model_name,
+            "concurrency": round(self.concurrency, 2),
+            "batch_size": self.batch_size,
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "latency_s": self.latency_s,
+            "tokens_per_resume": self.tokens_per_resume,
+            "resumes_per_s": self.throughput.get(self.batch_size),
+        }
+
+    def has_capacity(self) -> bool:
+        """Whether another call may start now"""
+        with self._lock:
+            return time.time() >= self.backoff_until and self.in_flight < int(self.concurrency)
+
+    def backoff_remaining(self) -> float:
+        """Seconds left in the current rate-limit backoff"""
+        return max(0.0, self.backoff_until - time.time())
+
+    def next_batch_size(self) -> int:
+        """Batch size for the next call, capped by the prompt token budget"""
+        with self._lock:
+            size = self.batch_size
+            if self.tokens_per_resume:
+                size = min(size, _power_of_two(MAX_PROMPT_TOKENS / self.tokens_per_resume))
+            return size
+
+    def start_call(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def abandon_call(self):
+        """Release the slot of a call whose outcome will not be recorded"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_success(self, batch_size: int, latency_s: float, input_tokens: int):
+        """
+        Additive increase on success and batch-size hill climbing
+
+        Args:
+            batch_size: Resumes in the completed call
+            latency_s: Call latency
+            input_tokens: Prompt tokens of the call
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.calls += 1
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / max(self.concurrency, 1.0))
+            self.latency_s = _ewma(self.latency_s, latency_s)
+            if batch_size and input_tokens:
+                self.tokens_per_resume = _ewma(self.tokens_per_resume, input_tokens / batch_size)
+
+            if batch_size != self.batch_size:
+                return
+            rate = batch_size / max(latency_s, 1e-6)
+            self.throughput[batch_size] = _ewma(self.throughput.get(batch_size), rate)
+            self._calls_at_size += 1
+            if self._calls_at_size >= ADJUST_EVERY:
+                self._adjust_batch_size()
+
+    def _adjust_batch_size(self):
+        current = self.throughput.get(self.batch_size, 0.0)
+        previous = self.throughput.get(self._previous_size) if self._previous_size else None
+        if previous is not None and current < previous:
+            self._direction = -self._direction
+
+        new_size = self.batch_size * 2 if self._direction > 0 else self.batch_size // 2
+        new_size = _power_of_two(min(new_size, MAX_BATCH_SIZE))
+        if self.tokens_per_resume:
+            new_size = min(new_size, _power_of_two(MAX_PROMPT_TOKENS / self.tokens_per_resume))
+
+        self._previous_size = self.batch_size
+        self.batch_size = new_size
+        self._calls_at_size = 0
+
+    def record_failure(self, rate_limited: bool):
+        """
+        Multiplicative decrease on rate limits; smaller batches on other errors
+
+        Args:
+            rate_limited: Whether the failure was a 429 / quota error
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.calls += 1
+            self._calls_at_size = 0
+            if rate_limited:
+                self.rate_limited += 1
+                if self.concurrency <= 1.0:
+                    self.batch_size = max(1, self.batch_size // 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.backoff_until = time.time() + BACKOFF_SECONDS * (1 + self.rate_limited % 4)
+            else:
+                self.errors += 1
+                self.batch_size = max(1, self.batch_size // 2)
+
+
+def get_controller(model_name: str, initial_batch_size: int = 10) -> AdaptiveController:
+    """
+    Get the process-wide controller for a model
+
+    Args:
+        model_name: Model the controller tunes
+        initial_batch_size: Batch size used when nothing has been learned yet
+
+    Returns:
+        Shared AdaptiveController
+    """
+    with _controllers_lock:
+        if model_name not in _controllers:
+            _controllers[model_name] = AdaptiveController(model_name, initial_batch_size)
+        return _controllers[model_name]
+
+
+def get_controller_snapshots() -> List[Dict]:
+    """Learned settings of every controller created in this process"""
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return [controller.snapshot() for controller in controllers]
+
+
+def _timed_call(call: Callable[[List, Dict], Any], batch: List) -> Tuple[Any, Dict]:
+    run_stats = {}
+    started = time.perf_counter()
+    value = call(batch, run_stats)
+    run_stats.setdefault("latency_s", time.perf_counter() - started)
+    return value, run_stats
+
+
+def run_batches(items: List, call: Callable[[List, Dict], Any],
+                controller: AdaptiveController,
+                on_result: Optional[Callable[[List, Any, Dict], None]] = None) -> List[Tuple[List, Any, Dict]]:
+    """
+    Run call over items in adaptively sized, concurrently executed batches
+
+    The batch size is read from the controller once, when the run starts.
+    Failed batches are retried, split in half unless rate limited.
+
+    Args:
+        items: Items to process (e.g. resume dictionaries)
+        call: Function taking (batch, run_stats) and returning a result
+        controller: Controller deciding batch size and concurrency
+        on_result: Optional function called with (batch, result, run_stats)
+            as each batch completes
+
+    Returns:
+        List of (batch, result, run_stats) tuples in item order
+    """
+    results = {}
+    batch_size = controller.next_batch_size()
+    pending = deque(
+        (start, items[start:start + batch_size], 0) for start in range(0, len(items), batch_size)
+    )
+    futures = {}
+
+    with ThreadPoolExecutor(max_workers=controller.max_concurrency) as executor:
+        try:
+            while pending or futures:
+                while pending and controller.has_capacity():
+                    start, batch, attempt = pending.popleft()
+                    controller.start_call()
+                    futures[executor.submit(_timed_call, call, batch)] = (start, batch, attempt)
+
+                if not futures:
+                    time.sleep(min(0.5, controller.backoff_remaining()) or 0.01)
+                    continue
+
+                done, _ = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, batch, attempt = futures.pop(future)
+                    try:
+                        value, run_stats = future.result()
+                    except Exception as e:
+                        rate_limited = is_rate_limit_error(e)
+                        controller.record_failure(rate_limited)
+                        if attempt + 1 >= MAX_RETRIES:
+                            raise
+                        if not rate_limited and len(batch) > 1:
+                            middle = len(batch) // 2
+                            pending.appendleft((start + middle, batch[middle:], attempt + 1))
+                            pending.appendleft((start, batch[:middle], attempt + 1))
+                        else:
+                            pending.appendleft((start, batch, attempt + 1))
+                        continue
+
+                    results[start] = (batch, value, run_stats)
+                    if run_stats.get("coalesced"):
+                        # Shared or stored results say nothing about latency or throughput
+                        controller.abandon_call()
+                    else:
+                        controller.record_success(
+                            len(batch),
+                            run_stats.get("latency_s", 0.0),
+                            run_stats.get("input_tokens") or sum(estimate_tokens(str(item)) for item in batch)
+                        )
+                    # Called only after the slot is released, so a failing callback cannot leak it
+                    if on_result is not None:
+                        on_result(batch, value, run_stats)
+        finally:
+            # On any error, release the slots of calls still queued or running
+            for outstanding in futures:
+                outstanding.add_done_callback(lambda _: controller.abandon_call())
+                outstanding.cancel()
+            controller.save()
+
+    return [results[start] for start in sorted(results)]
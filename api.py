@@ -0,0 +1,565 @@
+"""
+Async HTTP API for programmatic resume screening
+
+ASGI app (Starlette) meant to run under gunicorn with uvicorn workers:
+
+    gunicorn api:app -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8081
+
+Endpoints:
+    POST /jobs                submit resumes (multipart files and/or GCS URIs) and a JD
+    GET  /jobs/{job_id}       job status, file manifest and results
+    GET  /jobs/{job_id}/events  server-sent events with progress and results
+    GET  /health              liveness check
+
+Events: "status" on each state change, "file" as each resume is
+extracted, "triage" when the triage tier has built the shortlist,
+"batch" with each analysis batch's candidates as it completes, then one
+"result" per final top candidate and a closing "report".
+
+Connections and event streams are coroutines on the event loop. Blocking
+work (upload spooling, text extraction, OCR, Gemini calls) runs on a small
+shared thread pool and at most API_MAX_ACTIVE_JOBS jobs are analyzed at
+once, so hundreds of open requests do not need hundreds of threads. Job
+state is mirrored to disk so any worker on the host can answer status
+and event requests.
+"""
+import os
+import json
+import time
+import uuid
+import hmac
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Tuple, Callable
+import google.generativeai as genai
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from extraction_cache import ingest_file, complete_ocr, get_cached_text, prune_cache
+from ocr_fallback import OCR_TIMEOUT_SECONDS
+from deduplication import deduplicate_resumes, attach_duplicate_results
+from model_cascade import analyze_resumes_with_cascade, get_cascade_config, packed_text_chars
+from local_scoring import score_resumes_locally
+from text_normalization import normalize_resumes
+from talent_pool import get_connection, save_analysis
+
+API_KEY = os.getenv("SCREENER_API_KEY", "")
+API_WORKER_THREADS = int(os.getenv("API_WORKER_THREADS", "8"))
+API_MAX_ACTIVE_JOBS = int(os.getenv("API_MAX_ACTIVE_JOBS", "4"))
+API_MAX_FILES = int(os.getenv("API_MAX_FILES", "500"))
+API_MAX_UPLOAD_BYTES = int(os.getenv("API_MAX_UPLOAD_MB", "20")) * 1024 * 1024
+API_JOB_TTL_SECONDS = int(os.getenv("API_JOB_TTL", "86400"))
+# A file whose OCR takes longer is reported as failed so its worker thread is freed
+API_OCR_TIMEOUT_SECONDS = float(os.getenv("API_OCR_TIMEOUT", str(OCR_TIMEOUT_SECONDS)))
+JOB_STORE_DIR = os.getenv(
+    "API_JOB_STORE_DIR", os.path.join(tempfile.gettempdir(), "resume_screener_jobs")
+)
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+TERMINAL_STATUSES = ('done', 'failed')
+KEEPALIVE_SECONDS = 15
+POLL_SECONDS = 0.5
+PRUNE_INTERVAL_SECONDS = 300
+
+_executor = ThreadPoolExecutor(max_workers=API_WORKER_THREADS, thread_name_prefix="api-worker")
+_job_slots = asyncio.Semaphore(API_MAX_ACTIVE_JOBS)
+_jobs: Dict[str, "Job"] = {}
+_tasks = set()
+_storage_client = None
+_last_prune = 0.0
+
+
+class Job:
+    """Screening job owned by this worker; every event is mirrored to disk"""
+
+    def __init__(self, job_description: str, scoring_engine: str, save_to_pool: bool):
+        self.job_id = uuid.uuid4().hex
+        self.job_description = job_description
+        self.scoring_engine = scoring_engine
+        self.save_to_pool = save_to_pool
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.files: List[Dict] = []
+        self.results: List[Dict] = []
+        self.tier_report: List[Dict] = []
+        self.normalization: List[Dict] = []
+        self.error: Optional[str] = None
+        self.events: List[Dict] = []
+        self.changed = asyncio.Event()
+        self._persist_lock = asyncio.Lock()
+        self._persist_pending = False
+
+    def to_dict(self, include_events: bool = False) -> Dict:
+        state = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "scoring_engine": self.scoring_engine,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "files": self.files,
+            "results": self.results,
+            "tier_report": self.tier_report,
+            "normalization": self.normalization,
+            "error": self.error,
+        }
+        if include_events:
+            state["events"] = self.events
+        return state
+
+    def publish(self, event: str, data: Dict):
+        """Record an event, wake event streams and schedule a write to the job store"""
+        self.updated_at = time.time()
+        self.events.append({"id": len(self.events), "event": event, "data": data})
+        self.changed.set()
+        self.changed = asyncio.Event()
+        if not self._persist_pending:
+            self._persist_pending = True
+            _track(asyncio.create_task(self._persist()))
+
+    async def _persist(self):
+        # Events published while a write is queued or running share the next write
+        async with self._persist_lock:
+            self._persist_pending = False
+            state = json.dumps(self.to_dict(include_events=True), default=str)
+            await run_blocking(_write_job_state, self.job_id, state)
+
+    def set_status(self, status: str, **data):
+        self.status = status
+        self.publish("status", {"status": status, **data})
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOB_STORE_DIR, f"{job_id}.json")
+
+
+def _track(task: asyncio.Task):
+    """Keep a reference to a background task until it finishes"""
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _write_job_state(job_id: str, state: str):
+    os.makedirs(JOB_STORE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=JOB_STORE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as state_file:
+            state_file.write(state)
+        os.replace(tmp_path, _job_path(job_id))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def read_job_state(job_id: str) -> Optional[Dict]:
+    """
+    Load a job's state from this worker or from the on-disk store
+
+    Args:
+        job_id: Job identifier
+
+    Returns:
+        Job state including events, or None for unknown jobs
+    """
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job.to_dict(include_events=True)
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(_job_path(job_id), 'r', encoding='utf-8') as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return None
+
+
+def prune_jobs(ttl_seconds: int = API_JOB_TTL_SECONDS):
+    """Forget finished jobs older than the TTL, in memory and on disk"""
+    cutoff = time.time() - ttl_seconds
+    for job_id, job in list(_jobs.items()):
+        if job.status in TERMINAL_STATUSES and job.updated_at < cutoff:
+            _jobs.pop(job_id, None)
+    try:
+        for entry in os.scandir(JOB_STORE_DIR):
+            if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+    except OSError:
+        pass
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking call on the shared worker pool"""
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+def _spool_upload(source, suffix: str) -> str:
+    """Copy an uploaded file to a private temp file, enforcing the size limit"""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="api_upload_")
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as target:
+            while True:
+                chunk = source.read(1024 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > API_MAX_UPLOAD_BYTES:
+                    raise ValueError(f"File exceeds {API_MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit")
+                target.write(chunk)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _ingest_spooled(filename: str, path: str) -> Dict:
+    try:
+        with open(path, 'rb') as spooled:
+            entry = ingest_file(filename, spooled)
+    finally:
+        os.unlink(path)
+    if entry.get('ocr') == 'pending':
+        complete_ocr(entry, timeout=API_OCR_TIMEOUT_SECONDS)
+    return entry
+
+
+def parse_gcs_uri(uri: str) -> Tuple[str, str]:
+    """
+    Split a gs:// URI into bucket and object name
+
+    Args:
+        uri: URI like gs://bucket/path/resume.pdf
+
+    Returns:
+        Tuple of (bucket, object name)
+    """
+    if not uri.startswith("gs://") or "/" not in uri[5:]:
+        raise ValueError(f"Invalid GCS URI: {uri}")
+    bucket_name, blob_name = uri[5:].split("/", 1)
+    if not bucket_name or not blob_name:
+        raise ValueError(f"Invalid GCS URI: {uri}")
+    return bucket_name, blob_name
+
+
+def _ingest_gcs(uri: str) -> Dict:
+    global _storage_client
+    from google.cloud import storage
+
+    bucket_name, blob_name = parse_gcs_uri(uri)
+    if _storage_client is None:
+        _storage_client = storage.Client()
+    blob = _storage_client.bucket(bucket_name).blob(blob_name)
+    with blob.open('rb') as stream:
+        entry = ingest_file(os.path.basename(blob_name), stream)
+    if entry.get('ocr') == 'pending':
+        complete_ocr(entry, timeout=API_OCR_TIMEOUT_SECONDS)
+    return entry
+
+
+def _load_texts(files: List[Dict]) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """Load cached text for extracted files, collapsing byte-identical copies"""
+    resume_texts = []
+    seen_hashes = set()
+    duplicates = {}
+    for entry in files:
+        if entry['error']:
+            continue
+        if entry['content_hash'] in seen_hashes:
+            duplicates.setdefault(entry['content_hash'], []).append(entry['filename'])
+            continue
+        text = get_cached_text(entry['content_hash'])
+        if text and text.strip():
+            seen_hashes.add(entry['content_hash'])
+            resume_texts.append({'filename': entry['filename'], 'text': text,
+                                 'content_hash': entry['content_hash']})
+    return resume_texts, duplicates
+
+
+def _screen(resume_texts: List[Dict], duplicates: Dict[str, List[str]], job_description: str,
+            scoring_engine: str, save_to_pool: bool,
+            on_progress: Optional[Callable[[str, Dict], None]] = None) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """Deduplicate and score resumes (blocking; runs on the worker pool)"""
+    resume_texts, near_duplicates = deduplicate_resumes(resume_texts)
+    for file_hash, copies in near_duplicates.items():
+        duplicates.setdefault(file_hash, []).extend(copies)
+
+    if scoring_engine == 'local':
+        started = time.perf_counter()
+        results = score_resumes_locally(resume_texts, job_description)
+        normalization = []
+        tier_report = [{
+            "tier": "local", "model": "local", "resumes": len(resume_texts), "calls": 0,
+            "latency_s": time.perf_counter() - started, "input_tokens": 0, "output_tokens": 0,
+            "cached_tokens": 0, "estimated_cost": 0.0
+        }]
+    else:
+        cascade_config = get_cascade_config()
+        prompt_texts, normalization = normalize_resumes(
+            resume_texts, packed_text_chars(cascade_config, len(resume_texts))
+        )
+        results, tier_report = analyze_resumes_with_cascade(
+            prompt_texts, job_description, cascade_config, on_progress
+        )
+
+    if save_to_pool:
+        conn = get_connection()
+        try:
+            save_analysis(conn, resume_texts, results, job_description)
+        finally:
+            conn.close()
+
+    return attach_duplicate_results(results, duplicates), tier_report, normalization
+
+
+async def _ingest(index: int, source: str, fn, *args) -> Tuple[int, Dict]:
+    """Run one blocking ingestion, turning failures into an error entry"""
+    try:
+        return index, await run_blocking(fn, *args)
+    except Exception as e:
+        return index, {'filename': source, 'content_hash': None, 'size': 0, 'chars': 0,
+                       'ocr': None, 'error': str(e)}
+
+
+async def run_job(job: Job, uploads: List[Tuple[str, str]], gcs_uris: List[str]):
+    """
+    Extract, deduplicate and score a job's resumes, publishing progress events
+
+    Args:
+        job: Job to run
+        uploads: (filename, spooled temp path) pairs
+        gcs_uris: gs:// URIs to download
+    """
+    try:
+        async with _job_slots:
+            job.set_status('extracting', files=len(uploads) + len(gcs_uris))
+            pending = [_ingest(i, filename, _ingest_spooled, filename, path)
+                       for i, (filename, path) in enumerate(uploads)]
+            pending += [_ingest(len(uploads) + i, uri, _ingest_gcs, uri) for i, uri in enumerate(gcs_uris)]
+
+            # Report each file as soon as it is extracted
+            entries = [None] * len(pending)
+            for next_entry in asyncio.as_completed(pending):
+                index, entry = await next_entry
+                entries[index] = entry
+                job.files.append(entry)
+                job.publish("file", entry)
+            job.files = entries
+
+            resume_texts, duplicates = await run_blocking(_load_texts, entries)
+            if not resume_texts:
+                raise Exception("No text could be extracted from submitted files")
+
+            job.set_status('analyzing', resumes=len(resume_texts))
+            loop = asyncio.get_running_loop()
+            results, tier_report, normalization = await run_blocking(
+                _screen, resume_texts, duplicates, job.job_description, job.scoring_engine, job.save_to_pool,
+                lambda event, data: loop.call_soon_threadsafe(job.publish, event, data)
+            )
+
+        job.tier_report = tier_report
+        job.normalization = normalization
+        for candidate in results:
+            job.results.append(candidate)
+            job.publish("result", candidate)
+        job.publish("report", {"tiers": tier_report, "duplicates": duplicates, "normalization": normalization})
+        job.set_status('done', results=len(results))
+    except Exception as e:
+        job.error = str(e)
+        job.set_status('failed', error=job.error)
+    finally:
+        for _, path in uploads:
+            if os.path.exists(path):
+                os.unlink(path)
+        await run_blocking(prune_cache)
+
+
+def _authorized(request: Request) -> bool:
+    if not API_KEY:
+        return True
+    return hmac.compare_digest(request.headers.get("x-api-key", ""), API_KEY)
+
+
+def _error(message: str, status_code: int) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def health(request: Request) -> JSONResponse:
+    active = sum(1 for job in _jobs.values() if job.status not in TERMINAL_STATUSES)
+    return JSONResponse({"status": "healthy", "active_jobs": active})
+
+
+async def submit_job(request: Request) -> JSONResponse:
+    """
+    Accept a screening job
+
+    Multipart form: job_description, files (repeated), gcs_uris (repeated
+    or comma separated), scoring_engine, save_to_pool. JSON body: the
+    same fields without files, gcs_uris as a list or comma-separated
+    string.
+    """
+    if not _authorized(request):
+        return _error("Invalid or missing API key", 401)
+
+    uploads = []
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            fields = {
+                "job_description": form.get("job_description", ""),
+                "scoring_engine": form.get("scoring_engine"),
+                "save_to_pool": form.get("save_to_pool"),
+                "gcs_uris": [uri for value in form.getlist("gcs_uris") for uri in str(value).split(",")],
+            }
+            files = [item for item in form.getlist("files") if hasattr(item, "filename")]
+        else:
+            fields = await request.json()
+            files = []
+        if not isinstance(fields, dict):
+            raise ValueError("Body must be an object")
+    except ValueError:
+        return _error("Body must be multipart/form-data or JSON", 400)
+
+    job_description = str(fields.get("job_description") or "").strip()
+    gcs_uris = fields.get("gcs_uris") or []
+    if isinstance(gcs_uris, str):
+        gcs_uris = gcs_uris.split(",")
+    if not isinstance(gcs_uris, list) or not all(isinstance(uri, str) for uri in gcs_uris):
+        return _error("gcs_uris must be a list of gs:// URI strings", 400)
+    gcs_uris = [uri.strip() for uri in gcs_uris if uri.strip()]
+    scoring_engine = str(fields.get("scoring_engine") or os.getenv("SCORING_ENGINE", "gemini")).lower()
+    save_to_pool = str(fields.get("save_to_pool") or os.getenv("TALENT_POOL_ENABLED", "true")).lower() == "true"
+
+    if not job_description:
+        return _error("job_description is required", 400)
+    if not files and not gcs_uris:
+        return _error("Provide resume files and/or gcs_uris", 400)
+    if len(files) + len(gcs_uris) > API_MAX_FILES:
+        return _error(f"At most {API_MAX_FILES} resumes per job", 413)
+    if scoring_engine not in ('gemini', 'local'):
+        return _error("scoring_engine must be 'gemini' or 'local'", 400)
+    try:
+        for uri in gcs_uris:
+            parse_gcs_uri(uri)
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    try:
+        for upload in files:
+            suffix = os.path.splitext(upload.filename or "")[1].lower()
+            if suffix not in SUPPORTED_EXTENSIONS:
+                raise ValueError(f"Unsupported file type: {upload.filename}")
+            uploads.append((upload.filename, await run_blocking(_spool_upload, upload.file, suffix)))
+    except ValueError as e:
+        for _, path in uploads:
+            os.unlink(path)
+        status_code = 413 if "limit" in str(e) else 400
+        return _error(str(e), status_code)
+
+    global _last_prune
+    if time.time() - _last_prune > PRUNE_INTERVAL_SECONDS:
+        _last_prune = time.time()
+        await run_blocking(prune_jobs)
+    job = Job(job_description, scoring_engine, save_to_pool)
+    _jobs[job.job_id] = job
+    job.publish("status", {"status": job.status})
+
+    _track(asyncio.create_task(run_job(job, uploads, gcs_uris)))
+
+    return JSONResponse({
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.job_id}",
+        "events_url": f"/jobs/{job.job_id}/events",
+    }, status_code=202)
+
+
+async def get_job(request: Request) -> JSONResponse:
+    if not _authorized(request):
+        return _error("Invalid or missing API key", 401)
+    state = read_job_state(request.path_params["job_id"])
+    if state is None:
+        return _error("Job not found", 404)
+    state.pop("events", None)
+    return JSONResponse(state)
+
+
+def format_sse(event: Dict) -> str:
+    """Serialize one job event as a server-sent event"""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+async def stream_job_events(job_id: str, last_event_id: int = -1):
+    """
+    Yield a job's events as SSE, replaying those after last_event_id
+
+    Jobs owned by this worker are followed through an asyncio.Event;
+    jobs owned by another worker are followed by polling the job store.
+    """
+    last_sent = time.monotonic()
+    while True:
+        job = _jobs.get(job_id)
+        changed = job.changed if job is not None else None
+        state = read_job_state(job_id)
+        if state is None:
+            return
+
+        for event in state["events"][last_event_id + 1:]:
+            yield format_sse(event)
+            last_event_id = event["id"]
+            last_sent = time.monotonic()
+        if state["status"] in TERMINAL_STATUSES:
+            return
+
+        if time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+        if changed is not None:
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(POLL_SECONDS)
+
+
+async def job_events(request: Request):
+    if not _authorized(request):
+        return _error("Invalid or missing API key", 401)
+    job_id = request.path_params["job_id"]
+    if read_job_state(job_id) is None:
+        return _error("Job not found", 404)
+
+    try:
+        last_event_id = int(request.headers.get("last-event-id", "-1"))
+    except ValueError:
+        last_event_id = -1
+
+    return StreamingResponse(
+        stream_job_events(job_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if os.getenv("GEMINI_API_KEY"):
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    yield
+    for task in list(_tasks):
+        task.cancel()
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/jobs", submit_job, methods=["POST"]),
+        Route("/jobs/{job_id}", get_job),
+        Route("/jobs/{job_id}/events", job_events),
+    ],
+    lifespan=lifespan,
+)
@@ -1,16 +1,28 @@
 import streamlit as st
 import os
-import tempfile
 import json
+import uuid
 from typing import List, Dict
 import pandas as pd
 from google.cloud import storage
 from google.cloud import aiplatform
 import google.generativeai as genai
-from text_extraction import extract_text_from_file
 from gcp_utils import upload_to_gcs, trigger_cloud_function
-from gemini_analysis import analyze_resumes_with_gemini
+from model_cascade import analyze_resumes_with_cascade, get_cascade_config, packed_text_chars
+from adaptive_batching import get_controller_snapshots
+from local_scoring import score_resumes_locally
+from text_normalization import normalize_resumes
+from run_profiling import RunProfiler, PROFILE_ENABLED, prune_profiles
+from talent_pool import get_thread_connection, save_analysis, search_candidates, match_job_description
+from deduplication import deduplicate_resumes, attach_duplicate_results
+from extraction_cache import ingest_file, complete_ocr, get_cached_text, prune_cache
+from ocr_fallback import OCR_TIMEOUT_SECONDS
+from results_table import (
+    build_results_frame, filter_results_frame, paginate, page_count,
+    write_export, prune_exports, parquet_available, EXPORT_FORMATS
+)
 import time
+from datetime import date, timedelta
 
 # Configure page
 st.set_page_config(
@@ -20,12 +32,28 @@ st.set_page_config(
 )
 
 # Initialize session state
-if 'uploaded_files' not in st.session_state:
-    st.session_state.uploaded_files = []
+if 'resume_manifest' not in st.session_state:
+    st.session_state.resume_manifest = []
+if 'uploader_key' not in st.session_state:
+    st.session_state.uploader_key = 0
 if 'job_description' not in st.session_state:
     st.session_state.job_description = ""
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
+if 'analysis_id' not in st.session_state:
+    st.session_state.analysis_id = None
+if 'results_frame' not in st.session_state:
+    st.session_state.results_frame = None
+if 'tier_report' not in st.session_state:
+    st.session_state.tier_report = []
+if 'normalization_report' not in st.session_state:
+    st.session_state.normalization_report = []
+if 'results_export' not in st.session_state:
+    st.session_state.results_export = None
+if 'profile_artifact' not in st.session_state:
+    st.session_state.profile_artifact = None
+
+DETAIL_PAGE_SIZE = 20
 
 def health_check():
     """Simple health check endpoint"""
@@ -45,6 +73,14 @@ def main():
         health = health_check()
         st.success(f"✅ {health['status'].title()}")
         st.caption(f"Version: {health['version']}")
+        
+        snapshots = get_controller_snapshots()
+        if snapshots:
+            with st.expander("Adaptive Throughput Settings"):
+                st.dataframe(
+                    pd.DataFrame(snapshots)[['model', 'batch_size', 'concurrency', 'rate_limited', 'resumes_per_s']],
+                    hide_index=True
+                )
     
     # Sidebar for configuration
     with st.sidebar:
@@ -59,6 +95,41 @@ def main():
         st.subheader("API Keys")
         gemini_api_key = st.text_input("Gemini API Key", type="password", value=os.getenv("GEMINI_API_KEY", ""))
         
+        # Scoring engine
+        st.subheader("Scoring Engine")
+        scoring_engine = st.radio(
+            "Score candidates with",
+            ["Gemini", "Local (deterministic)"],
+            index=1 if os.getenv("SCORING_ENGINE", "gemini").lower() == "local" else 0,
+            help="Local scoring is free, reproducible and explains each score; Gemini writes richer summaries"
+        )
+        
+        # Model cascade
+        st.subheader("Model Cascade")
+        cascade_defaults = get_cascade_config()
+        cascade_config = {
+            "enabled": st.checkbox("Triage with a fast model first", value=cascade_defaults["enabled"]),
+            "triage_model": st.text_input("Triage Model", value=cascade_defaults["triage_model"]),
+            "analysis_model": st.text_input("Analysis Model", value=cascade_defaults["analysis_model"]),
+            "shortlist_size": st.number_input("Shortlist Size", min_value=1, max_value=100, value=cascade_defaults["shortlist_size"]),
+            "min_triage_score": st.slider("Minimum Triage Score", 0, 100, cascade_defaults["min_triage_score"]),
+        }
+        
+        # Talent pool
+        st.subheader("Talent Pool")
+        save_to_pool = st.checkbox(
+            "Save analyses to talent pool",
+            value=os.getenv("TALENT_POOL_ENABLED", "true").lower() == "true"
+        )
+        
+        # Profiling
+        st.subheader("Diagnostics")
+        profile_run = st.checkbox(
+            "Profile next analysis run",
+            value=PROFILE_ENABLED,
+            help="Records per-stage timings, hot functions, allocations and a flamegraph for one run"
+        )
+        
         if st.button("Save Configuration"):
             st.success("Configuration saved!")
     
@@ -73,17 +144,35 @@ def main():
             "Choose resume files (PDF, DOCX)",
             type=['pdf', 'docx'],
             accept_multiple_files=True,
-            help="Upload multiple resume files for analysis"
+            help="Upload multiple resume files for analysis",
+            key=f"resume_uploader_{st.session_state.uploader_key}"
         )
         
         if uploaded_files:
-            st.session_state.uploaded_files = uploaded_files
-            st.success(f"Uploaded {len(uploaded_files)} files")
+            ingest_uploads(uploaded_files)
+            # Reset the uploader so Streamlit releases the uploaded bytes
+            st.session_state.uploader_key += 1
+            st.rerun()
+        
+        manifest = st.session_state.resume_manifest
+        if manifest:
+            st.success(f"Uploaded {len(manifest)} files")
             
             # Display uploaded files
             with st.expander("View Uploaded Files"):
-                for i, file in enumerate(uploaded_files):
-                    st.write(f"{i+1}. {file.name} ({file.size} bytes)")
+                for i, entry in enumerate(manifest):
+                    status = f" ⚠️ {entry['error']}" if entry['error'] else ""
+                    if entry.get('ocr') == 'done':
+                        status += " 🔎 OCR"
+                    elif entry.get('ocr') == 'unavailable':
+                        status += " ⚠️ scanned pages skipped (OCR not installed)"
+                    elif entry.get('ocr') == 'failed':
+                        status += " ⚠️ OCR failed"
+                    st.write(f"{i+1}. {entry['filename']} ({entry['size']} bytes){status}")
+            
+            if st.button("Clear Uploaded Files"):
+                st.session_state.resume_manifest = []
+                st.rerun()
     
     with col2:
         st.header("📝 Job Description")
@@ -100,24 +189,56 @@ def main():
             st.session_state.job_description = job_description
             st.success("Job description saved!")
     
+    # Search past candidates before uploading new files
+    display_talent_pool(st.session_state.job_description)
+    
     # Analysis section
-    if st.session_state.uploaded_files and st.session_state.job_description:
+    if st.session_state.resume_manifest and st.session_state.job_description:
         st.header("🔍 AI Analysis")
         
         if st.button("🚀 Analyze Resumes", type="primary"):
             with st.spinner("Processing resumes with AI..."):
                 try:
                     # Process files
-                    results = process_resumes(
-                        st.session_state.uploaded_files,
-                        st.session_state.job_description,
-                        project_id,
-                        bucket_name,
-                        gemini_api_key
-                    )
+                    profiler = RunProfiler(enabled=profile_run)
+                    profiler.metadata = {
+                        "resumes": len(st.session_state.resume_manifest),
+                        "scoring_engine": scoring_engine,
+                        "cascade": get_cascade_config(cascade_config),
+                    }
+                    with profiler:
+                        results, tier_report = process_resumes(
+                            st.session_state.resume_manifest,
+                            st.session_state.job_description,
+                            project_id,
+                            bucket_name,
+                            gemini_api_key,
+                            get_cascade_config(cascade_config),
+                            save_to_pool,
+                            scoring_engine == "Local (deterministic)",
+                            profiler
+                        )
                     
                     st.session_state.analysis_results = results
-                    st.success("Analysis complete!")
+                    st.session_state.tier_report = tier_report
+                    st.session_state.analysis_id = uuid.uuid4().hex
+                    previous_artifact = st.session_state.profile_artifact
+                    st.session_state.profile_artifact = None
+                    if previous_artifact and os.path.exists(previous_artifact):
+                        os.unlink(previous_artifact)
+                    if profile_run:
+                        # Profiling problems must not fail a completed analysis
+                        try:
+                            st.session_state.profile_artifact = profiler.save()
+                        except Exception as e:
+                            profiler.error = profiler.error or f"Could not save profile: {str(e)}"
+                        if profiler.error:
+                            st.warning(profiler.error)
+                    prune_profiles()
+                    if results:
+                        st.success("Analysis complete!")
+                    else:
+                        st.warning("No candidates were returned. Lower the minimum triage score to shortlist more resumes.")
                     
                 except Exception as e:
                     st.error(f"Error during analysis: {str(e)}")
@@ -125,43 +246,136 @@ def main():
     # Display results
     if st.session_state.analysis_results:
         display_results(st.session_state.analysis_results)
+        display_tier_report(st.session_state.tier_report)
+        display_normalization_report(st.session_state.normalization_report)
+
+def ingest_uploads(uploaded_files):
+    """Stream new uploads into the extraction cache and keep only their manifest entries"""
+    progress = st.progress(0.0, text="Extracting text from uploads...")
+    for i, file in enumerate(uploaded_files, 1):
+        file.seek(0)
+        # A full OCR queue defers the scan instead of holding up the text PDFs behind it
+        st.session_state.resume_manifest.append(ingest_file(file.name, file, block_on_ocr=False))
+        progress.progress(i / len(uploaded_files), text=f"Extracted {i}/{len(uploaded_files)}: {file.name}")
+    progress.empty()
+    
+    # Scanned PDFs were queued for OCR during extraction; merge their text now
+    pending = [entry for entry in st.session_state.resume_manifest if entry.get('ocr') == 'pending']
+    if pending:
+        with st.spinner(f"Running OCR on {len(pending)} scanned PDF(s)..."):
+            for entry in pending:
+                complete_ocr(entry, timeout=OCR_TIMEOUT_SECONDS)
+    prune_cache()
 
-def process_resumes(uploaded_files, job_description, project_id, bucket_name, gemini_api_key):
-    """Process uploaded resumes and return analysis results"""
+def process_resumes(resume_manifest, job_description, project_id, bucket_name, gemini_api_key,
+                    cascade_config=None, save_to_pool=False, local_scoring=False, profiler=None):
+    """Process ingested resumes and return analysis results with the per-tier report"""
+    profiler = profiler or RunProfiler(enabled=False)
+    cascade_config = cascade_config or get_cascade_config()
+    st.session_state.normalization_report = []
     
     # Configure Gemini
     genai.configure(api_key=gemini_api_key)
     
-    # Extract text from all files
+    # Load extracted text from the cache, skipping byte-identical copies
     resume_texts = []
-    for file in uploaded_files:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.name.split('.')[-1]}") as tmp_file:
-            tmp_file.write(file.getvalue())
-            tmp_file.flush()
+    filenames = {}
+    duplicates = {}
+    with profiler.stage("load_text"):
+        for entry in resume_manifest:
+            if entry['error']:
+                st.warning(f"Could not extract text from {entry['filename']}: {entry['error']}")
+                continue
             
-            try:
-                text = extract_text_from_file(tmp_file.name)
-                resume_texts.append({
-                    'filename': file.name,
-                    'text': text
-                })
-            except Exception as e:
-                st.warning(f"Could not extract text from {file.name}: {str(e)}")
-            finally:
-                os.unlink(tmp_file.name)
+            file_hash = entry['content_hash']
+            if file_hash in filenames:
+                duplicates.setdefault(file_hash, []).append(entry['filename'])
+                continue
+            
+            text = get_cached_text(file_hash)
+            if text is None:
+                st.warning(f"Extracted text for {entry['filename']} has expired, please upload it again")
+                continue
+            if not text.strip():
+                st.warning(f"No text found in {entry['filename']} (scanned document without OCR?), skipping")
+                continue
+            
+            resume_texts.append({
+                'filename': entry['filename'],
+                'text': text,
+                'content_hash': file_hash
+            })
+            filenames[file_hash] = entry['filename']
     
     if not resume_texts:
         raise Exception("No text could be extracted from uploaded files")
     
-    # Analyze with Gemini
-    results = analyze_resumes_with_gemini(resume_texts, job_description)
+    # Collapse near-duplicates so only one copy is scored
+    with profiler.stage("deduplicate"):
+        resume_texts, near_duplicates = deduplicate_resumes(resume_texts)
+    for file_hash, copies in near_duplicates.items():
+        duplicates.setdefault(file_hash, []).extend(copies)
+    
+    if duplicates:
+        removed = sum(len(copies) for copies in duplicates.values())
+        st.info(f"Skipped {removed} duplicate resume(s): " + "; ".join(
+            f"{', '.join(copies)} (same as {filenames[file_hash]})" for file_hash, copies in duplicates.items()
+        ))
+    
+    if local_scoring:
+        # Deterministic local scores, no API calls
+        started = time.perf_counter()
+        with profiler.stage("local_scoring"):
+            results = score_resumes_locally(resume_texts, job_description)
+        tier_report = [{
+            "tier": "local", "model": "local", "resumes": len(resume_texts), "calls": 0,
+            "latency_s": time.perf_counter() - started, "input_tokens": 0, "output_tokens": 0,
+            "cached_tokens": 0, "estimated_cost": 0.0
+        }]
+    else:
+        # Strip layout noise before packing prompts, then triage and analyze the shortlist
+        with profiler.stage("normalize_text"):
+            prompt_texts, st.session_state.normalization_report = normalize_resumes(
+                resume_texts, packed_text_chars(cascade_config, len(resume_texts))
+            )
+        with profiler.stage("gemini_cascade"):
+            results, tier_report = analyze_resumes_with_cascade(prompt_texts, job_description, cascade_config)
+    profiler.metadata["tiers"] = tier_report
+    
+    if save_to_pool:
+        try:
+            with profiler.stage("talent_pool"):
+                save_analysis(get_talent_pool(), resume_texts, results, job_description)
+        except Exception as e:
+            st.warning(f"Could not save results to talent pool: {str(e)}")
+    
+    return attach_duplicate_results(results, duplicates), tier_report
+
+def load_results_frame(analysis_id, results):
+    """Build the columnar results frame once per analysis run and keep it in this session"""
+    cached = st.session_state.results_frame
+    if cached is None or cached[0] != analysis_id:
+        cached = (analysis_id, build_results_frame(results))
+        st.session_state.results_frame = cached
+    return cached[1]
+
+def load_results_export(export_key, export_format, df):
+    """Write the filtered results to an export file, replacing this session's previous export"""
+    previous = st.session_state.results_export
+    if previous and previous[0] == export_key and os.path.exists(previous[1]):
+        return previous[1]
     
-    return results
+    path = write_export(df, export_format)
+    st.session_state.results_export = (export_key, path)
+    if previous and os.path.exists(previous[1]):
+        os.unlink(previous[1])
+    prune_exports()
+    return path
 
 def display_results(results):
     """Display analysis results in a clean table"""
     
-    st.header("📊 Top 5 Candidates")
+    st.header("📊 Top Candidates")
     
     if isinstance(results, str):
         try:
@@ -174,48 +388,173 @@ def display_results(results):
         st.error("Invalid results format")
         return
     
-    # Create DataFrame for display
-    df_data = []
-    for candidate in results:
-        df_data.append({
-            'Name': candidate.get('name', 'Unknown'),
-            'Match Score': f"{candidate.get('match_score', 0)}/100",
-            'Summary': candidate.get('summary', 'No summary available'),
-            'Missing Skills': ', '.join(candidate.get('missing_skills', []))
-        })
+    df = load_results_frame(st.session_state.analysis_id, results)
     
-    df = pd.DataFrame(df_data)
+    # Filters and sorting
+    filter_col1, filter_col2, filter_col3 = st.columns([2, 2, 1])
+    with filter_col1:
+        min_score, max_score = st.slider("Match score range", 0, 100, (0, 100))
+    with filter_col2:
+        skill = st.text_input("Hide candidates missing skill", value="")
+    with filter_col3:
+        sort_label = st.selectbox("Sort by", ["Match Score", "Name"])
+    
+    sort_by = 'match_score' if sort_label == "Match Score" else 'name'
+    ascending = sort_by == 'name'
+    view = filter_results_frame(df, min_score, max_score, skill, sort_by, ascending)
+    
+    st.caption(f"Showing {len(view)} of {len(df)} candidates")
     
     # Display table
     st.dataframe(
-        df,
+        view[['name', 'match_score', 'summary', 'missing_skills_text']],
         use_container_width=True,
-        hide_index=True
+        hide_index=True,
+        column_config={
+            'name': 'Name',
+            'match_score': st.column_config.NumberColumn('Match Score', format="%d/100"),
+            'summary': 'Summary',
+            'missing_skills_text': 'Missing Skills'
+        }
     )
     
     # Download results
-    csv = df.to_csv(index=False)
-    st.download_button(
-        label="📥 Download Results as CSV",
-        data=csv,
-        file_name="resume_analysis_results.csv",
-        mime="text/csv"
-    )
+    formats = ['csv'] + (['parquet'] if parquet_available() else [])
+    export_format = st.radio("Export format", formats, horizontal=True, format_func=str.upper)
+    mime, extension = EXPORT_FORMATS[export_format]
+    export_key = (st.session_state.analysis_id, export_format, min_score, max_score, skill, sort_by, ascending)
+    export_path = load_results_export(export_key, export_format, view)
+    # download_button reads the whole file; the export is only rewritten when filters change
+    with open(export_path, 'rb') as export_file:
+        st.download_button(
+            label=f"📥 Download Results as {export_format.upper()}",
+            data=export_file,
+            file_name=f"resume_analysis_results.{extension}",
+            mime=mime
+        )
+    
+    # Profiling artifact from the last run, if profiling was enabled
+    profile_artifact = st.session_state.profile_artifact
+    if profile_artifact and os.path.exists(profile_artifact):
+        with open(profile_artifact, 'rb') as artifact_file:
+            st.download_button(
+                label="📥 Download Profile (report, pstats, flamegraph stacks)",
+                data=artifact_file,
+                file_name=os.path.basename(profile_artifact),
+                mime="application/zip"
+            )
     
     # Detailed view
     st.subheader("🔍 Detailed Analysis")
-    for i, candidate in enumerate(results, 1):
-        with st.expander(f"#{i} {candidate.get('name', 'Unknown')} - Score: {candidate.get('match_score', 0)}/100"):
+    pages = page_count(view, DETAIL_PAGE_SIZE)
+    page = 0
+    if pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) - 1
+    
+    offset = page * DETAIL_PAGE_SIZE
+    for i, candidate in enumerate(paginate(view, page, DETAIL_PAGE_SIZE).itertuples(index=False), offset + 1):
+        with st.expander(f"#{i} {candidate.name} - Score: {candidate.match_score}/100"):
             st.write("**Summary:**")
-            st.write(candidate.get('summary', 'No summary available'))
+            st.write(candidate.summary)
             
             st.write("**Missing Skills:**")
-            missing_skills = candidate.get('missing_skills', [])
-            if missing_skills:
-                for skill in missing_skills:
-                    st.write(f"• {skill}")
+            if candidate.missing_skills:
+                for skill_name in candidate.missing_skills:
+                    st.write(f"• {skill_name}")
             else:
                 st.write("No missing skills identified")
+            
+            if candidate.score_breakdown:
+                st.write("**Score Breakdown:**")
+                st.dataframe(
+                    pd.DataFrame.from_dict(candidate.score_breakdown, orient='index'),
+                    use_container_width=True
+                )
+            
+            if candidate.duplicate_files:
+                st.write("**Duplicate Submissions:**")
+                st.write(', '.join(candidate.duplicate_files))
+
+def get_talent_pool():
+    """Talent pool connection for the session's script thread (sessions never share a transaction)"""
+    return get_thread_connection()
+
+def display_talent_pool(job_description):
+    """Search candidates saved from past analyses"""
+    with st.expander("🗂️ Talent Pool: Search Past Candidates"):
+        try:
+            pool = get_talent_pool()
+        except Exception as e:
+            st.error(f"Talent pool unavailable: {str(e)}")
+            return
+        
+        if job_description and st.button("Find past candidates for this job description"):
+            matches = match_job_description(pool, job_description)
+            if matches:
+                st.dataframe(
+                    pd.DataFrame(matches)[['name', 'filename', 'skill_coverage', 'best_score', 'skills']],
+                    use_container_width=True,
+                    hide_index=True
+                )
+            else:
+                st.info("No past candidates share skills with this job description")
+        
+        query_col, skill_col = st.columns([1, 1])
+        with query_col:
+            query = st.text_input("Search resume text", key="pool_query")
+        with skill_col:
+            skills = st.text_input("Required skills (comma separated)", key="pool_skills")
+        score_col, date_col = st.columns([1, 1])
+        with score_col:
+            min_score, max_score = st.slider("Past match score", 0, 100, (0, 100), key="pool_scores")
+        with date_col:
+            since = st.date_input("Seen since", value=date.today() - timedelta(days=365), key="pool_since")
+        
+        if st.button("Search Talent Pool"):
+            started = time.perf_counter()
+            scored_only = (min_score, max_score) != (0, 100)
+            matches = search_candidates(
+                pool,
+                query=query,
+                skills=skills.split(","),
+                min_score=min_score if scored_only else None,
+                max_score=max_score if scored_only else None,
+                since=time.mktime(since.timetuple())
+            )
+            st.caption(f"{len(matches)} candidates in {(time.perf_counter() - started) * 1000:.1f} ms")
+            if matches:
+                st.dataframe(
+                    pd.DataFrame(matches)[['name', 'filename', 'best_score', 'skills']],
+                    use_container_width=True,
+                    hide_index=True
+                )
+
+def display_tier_report(tier_report):
+    """Display cost and latency per model tier"""
+    if not tier_report:
+        return
+    
+    with st.expander("💰 Cost & Latency by Model Tier"):
+        st.dataframe(
+            pd.DataFrame(tier_report),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'latency_s': st.column_config.NumberColumn('Latency (s)', format="%.2f"),
+                'estimated_cost': st.column_config.NumberColumn('Est. Cost (USD)', format="$%.4f")
+            }
+        )
+
+def display_normalization_report(normalization_report):
+    """Display prompt tokens saved by text normalization per resume"""
+    if not normalization_report:
+        return
+    
+    report = pd.DataFrame(normalization_report)
+    saved = int(report['tokens_saved'].sum())
+    total = int(report['tokens_before'].sum()) or 1
+    with st.expander(f"✂️ Text Normalization: ~{saved:,} prompt tokens saved ({saved / total:.0%})"):
+        st.dataframe(report.sort_values('tokens_saved', ascending=False), use_container_width=True, hide_index=True)
 
 if __name__ == "__main__":
     main()
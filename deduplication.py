@@ -0,0 +1,227 @@
+"""
+Duplicate and near-duplicate resume detection
+"""
+import hashlib
+from typing import List, Dict, Tuple
+import numpy as np
+from text_extraction import clean_text
+from extraction_cache import get_cached_signature, put_cached_signature
+
+# MinHash / LSH parameters. 64 permutations split into 16 bands of 4 rows
+# puts the LSH candidate threshold around 0.5 Jaccard; candidates are then
+# verified against the (stricter) similarity threshold.
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.85
+
+# Coefficients stay below 2**32 so a * h + b fits in uint64 for 32-bit shingle hashes
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _make_permutations(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Build deterministic (a, b) coefficient columns for the MinHash permutations"""
+    a = np.empty((num_perm, 1), dtype=np.uint64)
+    b = np.empty((num_perm, 1), dtype=np.uint64)
+    for i in range(num_perm):
+        digest = hashlib.sha256(f"minhash-{i}".encode()).digest()
+        a[i] = int.from_bytes(digest[:4], 'big') or 1
+        b[i] = int.from_bytes(digest[4:8], 'big')
+    return a, b
+
+
+_PERMUTATIONS = _make_permutations(NUM_PERMUTATIONS)
+
+
+def content_hash(data) -> str:
+    """
+    Compute a content hash for exact duplicate detection
+
+    Args:
+        data: Raw file bytes or extracted text
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def resume_key(resume: Dict) -> str:
+    """
+    Stable identity of a resume within a run
+
+    Args:
+        resume: Dictionary with 'text' and optional 'content_hash'
+
+    Returns:
+        The file's content hash, or a hash of the cleaned text
+    """
+    return resume.get('content_hash') or content_hash(clean_text(resume['text']))
+
+
+def shingle(text: str, size: int = SHINGLE_SIZE) -> set:
+    """
+    Split text into a set of word shingles
+
+    Args:
+        text: Resume text
+        size: Number of words per shingle
+
+    Returns:
+        Set of shingle strings
+    """
+    words = clean_text(text).lower().split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str, num_perm: int = NUM_PERMUTATIONS) -> np.ndarray:
+    """
+    Compute the MinHash signature of a resume text
+
+    Args:
+        text: Resume text
+        num_perm: Number of hash permutations
+
+    Returns:
+        Array of num_perm minimum hash values (uint32)
+    """
+    shingles = shingle(text)
+    if not shingles:
+        return np.full(num_perm, _MAX_HASH, dtype=np.uint32)
+
+    hashed = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'big') for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+
+    a, b = _PERMUTATIONS if num_perm == NUM_PERMUTATIONS else _make_permutations(num_perm)
+    # One (num_perm x shingles) pass instead of a Python loop per permutation
+    permuted = ((a * hashed + b) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def resume_signature(resume: Dict) -> np.ndarray:
+    """
+    MinHash signature of a resume, reused from the extraction cache when possible
+
+    Signatures are stored next to the file's cached text, which never
+    changes for a given content hash.
+
+    Args:
+        resume: Dictionary with 'text' and optional 'content_hash'
+
+    Returns:
+        Signature array
+    """
+    file_hash = resume.get('content_hash')
+    if file_hash:
+        cached = get_cached_signature(file_hash, NUM_PERMUTATIONS)
+        if cached is not None:
+            return np.frombuffer(cached, dtype=np.uint32)
+
+    signature = minhash_signature(resume['text'])
+    if file_hash:
+        put_cached_signature(file_hash, NUM_PERMUTATIONS, signature.tobytes())
+    return signature
+
+
+def estimate_similarity(signature_a, signature_b) -> float:
+    """
+    Estimate Jaccard similarity from two MinHash signatures
+
+    Args:
+        signature_a: First signature
+        signature_b: Second signature
+
+    Returns:
+        Estimated similarity between 0 and 1
+    """
+    if len(signature_a) == 0:
+        return 0.0
+    return float(np.count_nonzero(np.asarray(signature_a) == np.asarray(signature_b))) / len(signature_a)
+
+
+def deduplicate_resumes(resume_texts: List[Dict], threshold: float = SIMILARITY_THRESHOLD) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    Collapse exact and near-duplicate resumes to one representative each
+
+    Exact duplicates are matched on 'content_hash' (or a hash of the text
+    when no file hash is present). Near-duplicates are found with MinHash
+    LSH banding and verified against the similarity threshold.
+
+    Args:
+        resume_texts: List of dictionaries with 'filename' and 'text'
+        threshold: Minimum estimated similarity for a near-duplicate
+
+    Returns:
+        Tuple of (unique resumes, each with 'content_hash' set, and a
+        mapping of representative content hash to the filenames of its
+        removed duplicates)
+    """
+    duplicates: Dict[str, List[str]] = {}
+
+    # Exact duplicates on content hash
+    seen = set()
+    exact_unique = []
+    for resume in resume_texts:
+        key = resume_key(resume)
+        if key in seen:
+            duplicates.setdefault(key, []).append(resume['filename'])
+            continue
+        seen.add(key)
+        exact_unique.append({**resume, 'content_hash': key})
+
+    # Near-duplicates with MinHash LSH
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    signatures = [resume_signature(resume) for resume in exact_unique]
+    buckets: Dict[Tuple, List[int]] = {}
+    representative_of = list(range(len(exact_unique)))
+
+    for index, signature in enumerate(signatures):
+        candidates = set()
+        for band in range(LSH_BANDS):
+            band_key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            bucket = buckets.setdefault(band_key, [])
+            candidates.update(bucket)
+            bucket.append(index)
+
+        for other in sorted(candidates):
+            rep = representative_of[other]
+            if rep == other and estimate_similarity(signature, signatures[other]) >= threshold:
+                representative_of[index] = other
+                break
+
+    unique = []
+    for index, resume in enumerate(exact_unique):
+        rep = representative_of[index]
+        if rep == index:
+            unique.append(resume)
+            continue
+        rep_key = exact_unique[rep]['content_hash']
+        duplicates.setdefault(rep_key, []).append(resume['filename'])
+        duplicates[rep_key].extend(duplicates.pop(resume['content_hash'], []))
+
+    return unique, duplicates
+
+
+def attach_duplicate_results(results: List[Dict], duplicates: Dict[str, List[str]]) -> List[Dict]:
+    """
+    Fan analysis results back out to the duplicates that were not scored
+
+    Args:
+        results: Candidate results carrying the 'content_hash' of the
+            resume they were scored on
+        duplicates: Mapping from deduplicate_resumes
+
+    Returns:
+        Results with 'duplicate_files' set on each representative
+    """
+    for candidate in results:
+        if isinstance(candidate, dict):
+            candidate['duplicate_files'] = duplicates.get(candidate.get('content_hash'), [])
+    return results
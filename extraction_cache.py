@@ -0,0 +1,346 @@
+"""
+On-disk extraction cache keyed by file content hash
+
+Uploads are streamed to disk in chunks while they are hashed, extracted
+once, and only the compressed text is kept. Callers hold just the
+content hash and a few bytes of metadata per file. PDF pages without a
+text layer are queued for OCR and merged back in by complete_ocr().
+"""
+import os
+import glob
+import zlib
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, BinaryIO, Tuple
+from text_extraction import extract_text_from_file, extract_pages_from_pdf, find_empty_pages, PAGE_BREAK
+from ocr_fallback import ocr_available, submit_ocr
+
+CACHE_DIR = os.getenv(
+    "EXTRACTION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "resume_screener_extractions")
+)
+CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512")) * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# content hash -> (OCR future, page texts, deferred job) for scans still being
+# OCR'd. The future is None while the job waits for a queue slot; the
+# deferred job is then the (temp file, empty page indexes) to submit.
+_pending_ocr: Dict[str, Tuple[Optional[Future], List[str], Optional[Tuple[str, List[int]]]]] = {}
+_pending_lock = threading.Lock()
+
+
+def _cache_path(content_hash: str) -> str:
+    return os.path.join(CACHE_DIR, f"{content_hash}.txt.z")
+
+
+def _ocr_marker_path(content_hash: str) -> str:
+    return os.path.join(CACHE_DIR, f"{content_hash}.ocr")
+
+
+def _signature_path(content_hash: str, num_perm: int) -> str:
+    return os.path.join(CACHE_DIR, f"{content_hash}.mh{num_perm}")
+
+
+def get_cached_signature(content_hash: str, num_perm: int) -> Optional[bytes]:
+    """
+    Load a cached MinHash signature for a file
+
+    Args:
+        content_hash: SHA-256 of the original file bytes
+        num_perm: Number of permutations in the signature
+
+    Returns:
+        Raw signature bytes, or None when not cached
+    """
+    try:
+        with open(_signature_path(content_hash, num_perm), 'rb') as signature_file:
+            return signature_file.read()
+    except OSError:
+        return None
+
+
+def put_cached_signature(content_hash: str, num_perm: int, signature: bytes):
+    """
+    Store a MinHash signature next to the file's cached text
+
+    Nothing is stored for text that is not in the cache, so signatures
+    are pruned together with their text.
+
+    Args:
+        content_hash: SHA-256 of the original file bytes
+        num_perm: Number of permutations in the signature
+        signature: Raw signature bytes
+    """
+    if not os.path.exists(_cache_path(content_hash)):
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as signature_file:
+            signature_file.write(signature)
+        os.replace(tmp_path, _signature_path(content_hash, num_perm))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def was_ocr_applied(content_hash: str) -> bool:
+    """Whether the cached text for this file includes OCR output"""
+    return os.path.exists(_ocr_marker_path(content_hash))
+
+
+def get_cached_text(content_hash: str) -> Optional[str]:
+    """
+    Load extracted text from the cache
+
+    Args:
+        content_hash: SHA-256 of the original file bytes
+
+    Returns:
+        Extracted text, or None when not cached
+    """
+    try:
+        with open(_cache_path(content_hash), 'rb') as cache_file:
+            return zlib.decompress(cache_file.read()).decode('utf-8')
+    except (OSError, zlib.error):
+        return None
+
+
+def put_cached_text(content_hash: str, text: str, ocr_applied: bool = False):
+    """
+    Store extracted text in the cache (compressed, written atomically)
+
+    Args:
+        content_hash: SHA-256 of the original file bytes
+        text: Extracted text
+        ocr_applied: Whether the text includes OCR output
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if ocr_applied:
+        open(_ocr_marker_path(content_hash), 'w').close()
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as cache_file:
+            cache_file.write(zlib.compress(text.encode('utf-8'), 6))
+        os.replace(tmp_path, _cache_path(content_hash))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def prune_cache(max_bytes: int = CACHE_MAX_BYTES):
+    """
+    Delete the least recently written cache entries above the size limit
+
+    Args:
+        max_bytes: Maximum total size of the cache directory
+    """
+    try:
+        entries = [entry for entry in os.scandir(CACHE_DIR) if entry.name.endswith(".txt.z")]
+    except OSError:
+        return
+
+    stats = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries))
+    total = sum(size for _, size, _ in stats)
+    for _, size, path in stats:
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+            stem = path[:-len(".txt.z")]
+            for companion in glob.glob(glob.escape(stem) + ".ocr") + glob.glob(glob.escape(stem) + ".mh*"):
+                os.unlink(companion)
+        except OSError:
+            pass
+
+
+def ingest_file(filename: str, stream: BinaryIO, chunk_size: int = CHUNK_SIZE,
+                block_on_ocr: bool = True) -> Dict:
+    """
+    Stream an uploaded file to disk, hash it and cache its extracted text
+
+    PDFs with image-only pages are handed to the OCR pool when an OCR
+    engine is installed; call complete_ocr() on entries whose 'ocr' is
+    'pending' to wait for and merge the result.
+
+    Args:
+        filename: Original file name (used for the extension)
+        stream: Readable binary stream with the file content
+        chunk_size: Bytes read per chunk
+        block_on_ocr: Wait for an OCR queue slot; when False a scan that finds
+            the queue full is deferred until complete_ocr() is called
+
+    Returns:
+        Manifest entry with 'filename', 'content_hash', 'size', 'chars',
+        'ocr' (None, 'pending', 'done', 'unavailable' or 'failed') and
+        'error' (None on success)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    suffix = os.path.splitext(filename)[1].lower()
+    keep_file = False
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                tmp_file.write(chunk)
+                size += len(chunk)
+            tmp_file.close()
+
+            content_hash = digest.hexdigest()
+            entry = {
+                'filename': filename,
+                'content_hash': content_hash,
+                'size': size,
+                'chars': 0,
+                'ocr': None,
+                'error': None
+            }
+
+            text = get_cached_text(content_hash)
+            if text is not None:
+                entry['chars'] = len(text)
+                entry['ocr'] = 'done' if was_ocr_applied(content_hash) else None
+                return entry
+
+            with _pending_lock:
+                if content_hash in _pending_ocr:
+                    entry['ocr'] = 'pending'
+                    return entry
+
+            try:
+                if suffix == '.pdf':
+                    pages = extract_pages_from_pdf(tmp_file.name)
+                    empty_pages = find_empty_pages(pages)
+                    text = PAGE_BREAK.join(pages).strip()
+                else:
+                    empty_pages = []
+                    text = extract_text_from_file(tmp_file.name)
+            except Exception as e:
+                entry['error'] = str(e)
+                return entry
+
+            if empty_pages and ocr_available():
+                # The OCR worker takes ownership of the temp file
+                keep_file = True
+                future = submit_ocr(tmp_file.name, empty_pages, block=block_on_ocr)
+                deferred = None if future is not None else (tmp_file.name, empty_pages)
+                with _pending_lock:
+                    _pending_ocr[content_hash] = (future, pages, deferred)
+                entry['ocr'] = 'pending'
+                entry['chars'] = len(text)
+                return entry
+
+            if empty_pages:
+                entry['ocr'] = 'unavailable'
+            put_cached_text(content_hash, text)
+            entry['chars'] = len(text)
+            return entry
+        finally:
+            if not keep_file:
+                os.unlink(tmp_file.name)
+
+
+def _relay_result(source: Future, target: Future):
+    try:
+        target.set_result(source.result())
+    except BaseException as e:
+        target.set_exception(e)
+
+
+def _start_deferred_ocr(content_hash: str, block: bool = False) -> bool:
+    """
+    Submit a deferred OCR job to the pool
+
+    Returns:
+        False when block is False and the queue is still full
+    """
+    with _pending_lock:
+        pending = _pending_ocr.get(content_hash)
+        if pending is None or pending[0] is not None:
+            return True
+        _, pages, (file_path, empty_pages) = pending
+        # Waiters get this future straight away, so the job is submitted once
+        claim = Future()
+        _pending_ocr[content_hash] = (claim, pages, None)
+
+    try:
+        future = submit_ocr(file_path, empty_pages, block=block)
+    except Exception as e:
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+        claim.set_exception(e)
+        return True
+    if future is None:
+        with _pending_lock:
+            _pending_ocr[content_hash] = (None, pages, (file_path, empty_pages))
+        return False
+    future.add_done_callback(lambda done: _relay_result(done, claim))
+    return True
+
+
+def _fill_ocr_queue():
+    """Submit deferred OCR jobs, in upload order, while the queue has room"""
+    with _pending_lock:
+        deferred = [content_hash for content_hash, (future, _, _) in _pending_ocr.items() if future is None]
+    for content_hash in deferred:
+        if not _start_deferred_ocr(content_hash):
+            break
+
+
+def complete_ocr(entry: Dict, timeout: Optional[float] = None) -> Dict:
+    """
+    Wait for a pending OCR job and merge its pages into the cached text
+
+    Deferred jobs are submitted first (this entry's blocking for a slot
+    if needed) so the pool keeps working through the queue.
+
+    Args:
+        entry: Manifest entry from ingest_file with 'ocr' == 'pending'
+        timeout: Seconds to wait for the OCR job (None waits indefinitely)
+
+    Returns:
+        The updated entry
+    """
+    content_hash = entry['content_hash']
+    with _pending_lock:
+        pending = _pending_ocr.get(content_hash)
+
+    if pending is None:
+        # Another session finished this file already
+        text = get_cached_text(content_hash)
+        entry['ocr'] = 'done' if text is not None and was_ocr_applied(content_hash) else 'failed'
+        entry['chars'] = len(text or "")
+        if not text:
+            entry['error'] = "No text could be extracted (OCR did not complete)"
+        return entry
+
+    _fill_ocr_queue()
+    _start_deferred_ocr(content_hash, block=True)
+    with _pending_lock:
+        pending = _pending_ocr.get(content_hash, pending)
+    future, pages, _ = pending
+    pages = list(pages)
+    ocr_error = None
+    try:
+        for page_number, page_text in future.result(timeout=timeout).items():
+            pages[page_number] = page_text
+        entry['ocr'] = 'done'
+    except Exception as e:
+        entry['ocr'] = 'failed'
+        ocr_error = str(e)
+    finally:
+        with _pending_lock:
+            _pending_ocr.pop(content_hash, None)
+
+    text = PAGE_BREAK.join(pages).strip()
+    put_cached_text(content_hash, text, ocr_applied=entry['ocr'] == 'done')
+    entry['chars'] = len(text)
+    if not text and ocr_error:
+        entry['error'] = f"OCR failed: {ocr_error}"
+    return entry
@@ -2,65 +2,126 @@
 Gemini AI analysis for resume screening
 """
 import google.generativeai as genai
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import json
+import time
+from prompt_cache import get_prefix_model
+from deduplication import resume_key
 
-def analyze_resumes_with_gemini(resume_texts: List[Dict], job_description: str) -> List[Dict]:
+DEFAULT_MODEL = 'gemini-pro'
+# Characters of each resume packed into the analysis prompt
+ANALYSIS_TEXT_CHARS = 2000
+
+def analyze_resumes_with_gemini(resume_texts: List[Dict], job_description: str,
+                                model_name: str = DEFAULT_MODEL,
+                                run_stats: Optional[Dict] = None) -> List[Dict]:
     """
     Analyze resumes using Gemini AI
     
     Args:
         resume_texts: List of dictionaries with 'filename' and 'text'
         job_description: Job description text
+        model_name: Gemini model to use
+        run_stats: Optional dict filled with model, latency and token usage
         
     Returns:
         List of top 5 candidates with analysis
     """
     
-    # Configure Gemini
-    model = genai.GenerativeModel('gemini-pro')
-    
-    # Create the analysis prompt
-    prompt = create_analysis_prompt(resume_texts, job_description)
+    # Shared instructions + job description, then this batch's resumes
+    prefix = create_analysis_prefix(job_description)
+    payload = create_resume_payload(resume_texts)
     
     try:
         # Generate analysis
-        response = model.generate_content(prompt)
+        response_text = generate_content(payload, model_name, run_stats, prefix=prefix)
         
         # Parse the response
-        results = parse_gemini_response(response.text)
+        results = parse_gemini_response(response_text)
         
         return results
         
     except Exception as e:
         raise Exception(f"Error in Gemini analysis: {str(e)}")
 
-def create_analysis_prompt(resume_texts: List[Dict], job_description: str) -> str:
+def generate_content(prompt: str, model_name: str = DEFAULT_MODEL,
+                     run_stats: Optional[Dict] = None, prefix: Optional[str] = None) -> str:
     """
-    Create the analysis prompt for Gemini
+    Send a prompt to a Gemini model and record latency and token usage
     
     Args:
-        resume_texts: List of resume data
-        job_description: Job description
+        prompt: Prompt text (the variable part when a prefix is given)
+        model_name: Gemini model to use
+        run_stats: Optional dict filled with model, latency and token usage
+        prefix: Optional prompt prefix shared across calls, served from
+            a context cache when the SDK and model support it
         
     Returns:
-        Formatted prompt string
+        Response text
     """
+    model = get_prefix_model(model_name, prefix) if prefix else None
+    cached = model is not None
+    if not cached:
+        model = genai.GenerativeModel(model_name)
+        prompt = (prefix or "") + prompt
     
-    # Prepare resume data for the prompt
-    resume_data = ""
-    for i, resume in enumerate(resume_texts, 1):
-        resume_data += f"\n--- RESUME {i}: {resume['filename']} ---\n"
-        resume_data += resume['text'][:2000] + "...\n"  # Limit text length
+    started = time.perf_counter()
+    response = model.generate_content(prompt)
+    latency = time.perf_counter() - started
     
-    prompt = f"""
-You are an expert technical recruiter with 15+ years of experience. Your task is to analyze the provided resumes and compare them against the job description to identify the top 5 candidates.
+    if run_stats is not None:
+        input_tokens, output_tokens = get_token_usage(response, prompt)
+        cached_tokens = 0
+        if cached:
+            # Cached prefix tokens are reported inside the prompt count
+            usage = getattr(response, 'usage_metadata', None)
+            cached_tokens = getattr(usage, 'cached_content_token_count', 0) or 0
+            input_tokens = max(0, input_tokens - cached_tokens)
+        run_stats.update({
+            "model": model_name,
+            "latency_s": latency,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens
+        })
+    
+    return response.text
 
-JOB DESCRIPTION:
-{job_description}
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the token count of a text (about 4 characters per token)
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Estimated token count
+    """
+    return max(1, len(text) // 4) if text else 0
 
-RESUMES TO ANALYZE:
-{resume_data}
+def get_token_usage(response, prompt: str) -> Tuple[int, int]:
+    """
+    Read token usage from a Gemini response, estimating it when unavailable
+    
+    Args:
+        response: Gemini response object
+        prompt: Prompt that produced the response
+        
+    Returns:
+        Tuple of (input tokens, output tokens)
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None and getattr(usage, 'prompt_token_count', None):
+        return usage.prompt_token_count, getattr(usage, 'candidates_token_count', 0) or 0
+    
+    try:
+        output_text = response.text
+    except Exception:
+        output_text = ""
+    return estimate_tokens(prompt), estimate_tokens(output_text)
+
+ANALYSIS_INSTRUCTIONS = """
+You are an expert technical recruiter with 15+ years of experience. Your task is to analyze the provided resumes and compare them against the job description to identify the top 5 candidates.
 
 INSTRUCTIONS:
 1. Carefully read each resume and the job description
@@ -73,18 +134,22 @@ INSTRUCTIONS:
 OUTPUT FORMAT:
 Return a JSON array with exactly 5 candidates (or fewer if less than 5 resumes provided). Each candidate object should have:
 - "name": Candidate's name (extract from resume)
+- "resume_number": The number N from the "RESUME N" header of the resume
+- "filename": The resume filename exactly as given in the RESUME header
 - "match_score": Integer from 0-100 representing match quality
 - "summary": 2-sentence summary explaining why they are a good fit
 - "missing_skills": Array of key skills they are missing (be specific)
 
 EXAMPLE OUTPUT:
 [
-  {{
+  {
     "name": "John Smith",
+    "resume_number": 1,
+    "filename": "john_smith_resume.pdf",
     "match_score": 85,
     "summary": "John has 5+ years of Python development experience and strong machine learning background. His experience with cloud platforms and data analysis makes him an excellent fit for this role.",
     "missing_skills": ["Docker", "Kubernetes", "React"]
-  }}
+  }
 ]
 
 IMPORTANT:
@@ -94,8 +159,53 @@ IMPORTANT:
 - Focus on the most relevant candidates
 - Consider both technical and soft skills
 """
+
+def create_analysis_prefix(job_description: str) -> str:
+    """
+    Create the part of the analysis prompt shared by every batch of a run
     
-    return prompt
+    Args:
+        job_description: Job description
+        
+    Returns:
+        Static instructions followed by the job description
+    """
+    return f"""{ANALYSIS_INSTRUCTIONS}
+JOB DESCRIPTION:
+{job_description}
+"""
+
+def create_resume_payload(resume_texts: List[Dict]) -> str:
+    """
+    Create the per-batch part of the analysis prompt
+    
+    Args:
+        resume_texts: List of resume data
+        
+    Returns:
+        Resume section of the prompt
+    """
+    resume_data = ""
+    for i, resume in enumerate(resume_texts, 1):
+        resume_data += f"\n--- RESUME {i}: {resume['filename']} ---\n"
+        resume_data += resume['text'][:ANALYSIS_TEXT_CHARS] + "...\n"  # Limit text length
+    
+    return f"""
+RESUMES TO ANALYZE:
+{resume_data}"""
+
+def create_analysis_prompt(resume_texts: List[Dict], job_description: str) -> str:
+    """
+    Create the full analysis prompt for Gemini
+    
+    Args:
+        resume_texts: List of resume data
+        job_description: Job description
+        
+    Returns:
+        Formatted prompt string
+    """
+    return create_analysis_prefix(job_description) + create_resume_payload(resume_texts)
 
 def parse_gemini_response(response_text: str) -> List[Dict]:
     """
@@ -114,15 +224,57 @@ def parse_gemini_response(response_text: str) -> List[Dict]:
         
         if start_idx != -1 and end_idx != 0:
             json_str = response_text[start_idx:end_idx]
-            return json.loads(json_str)
+            candidates = json.loads(json_str)
         else:
             # If no JSON found, try to parse the entire response
-            return json.loads(response_text)
+            candidates = json.loads(response_text)
+        
+        # Replies like "null" or a bare object are not a candidate list
+        return candidates if isinstance(candidates, list) else create_fallback_response(response_text)
             
     except json.JSONDecodeError as e:
         # If JSON parsing fails, create a fallback response
         return create_fallback_response(response_text)
 
+def assign_resume_ids(candidates: List[Dict], resume_texts: List[Dict]) -> List[Dict]:
+    """
+    Tie each candidate to the resume it was scored on
+    
+    The resume number from the prompt header identifies the resume; the
+    returned filename is only trusted when it is unique in the batch.
+    Matched candidates get the resume's 'filename' and 'content_hash'.
+    
+    Args:
+        candidates: Parsed candidates for one batch
+        resume_texts: The batch's resumes in prompt order
+        
+    Returns:
+        The same candidates
+    """
+    by_key = {resume_key(resume): resume for resume in resume_texts}
+    by_filename = {}
+    for resume in resume_texts:
+        by_filename[resume['filename']] = None if resume['filename'] in by_filename else resume
+    
+    for candidate in candidates:
+        if not isinstance(candidate, dict):
+            continue
+        number = candidate.pop('resume_number', None)
+        resume = by_key.get(candidate.get('content_hash'))
+        if resume is None:
+            try:
+                index = int(number) - 1
+            except (TypeError, ValueError):
+                index = -1
+            if 0 <= index < len(resume_texts):
+                resume = resume_texts[index]
+        if resume is None:
+            resume = by_filename.get(candidate.get('filename'))
+        if resume is not None:
+            candidate['filename'] = resume['filename']
+            candidate['content_hash'] = resume_key(resume)
+    return candidates
+
 def create_fallback_response(response_text: str) -> List[Dict]:
     """
     Create a fallback response when JSON parsing fails
@@ -160,6 +312,7 @@ def validate_candidate_data(candidates: List[Dict]) -> List[Dict]:
             
         validated_candidate = {
             "name": candidate.get("name", "Unknown"),
+            "filename": candidate.get("filename", ""),
             "match_score": max(0, min(100, int(candidate.get("match_score", 0)))),
             "summary": candidate.get("summary", "No summary available"),
             "missing_skills": candidate.get("missing_skills", [])
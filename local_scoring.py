@@ -0,0 +1,298 @@
+"""
+Deterministic, locally computed match scores with explainable features
+
+Each resume is scored from four features against a pre-parsed job
+description: skill coverage, years of experience (from date ranges),
+title similarity and education level. Features are combined with
+configurable weights into a 0-100 score plus a per-feature breakdown.
+"""
+import os
+import re
+import json
+from datetime import date
+from typing import List, Dict, Optional, Set
+from skill_extraction import extract_skills
+from deduplication import resume_key
+
+DEFAULT_WEIGHTS = {
+    "skill_coverage": 0.5,
+    "experience": 0.25,
+    "title": 0.15,
+    "education": 0.1,
+}
+
+# Years of experience treated as a full match when the JD states no requirement
+DEFAULT_REQUIRED_YEARS = 3
+
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+_MONTH = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?'
+# Patterns below run on lower-cased text (faster than re.IGNORECASE)
+_DATE_RANGE = re.compile(
+    rf'(?:(?P<start_month>{_MONTH})\s*|(?P<start_num>\d{{1,2}})\s*/\s*)?(?P<start_year>(?:19|20)\d{{2}})'
+    rf'\s*(?:-|–|—|to|until)\s*'
+    rf'(?:(?:(?P<end_month>{_MONTH})\s*|(?P<end_num>\d{{1,2}})\s*/\s*)?(?P<end_year>(?:19|20)\d{{2}})'
+    rf'|(?P<present>present|current|now|today|date))'
+)
+_DATED_LINE = re.compile(r'^.*(?:19|20)\d\d.*$', re.MULTILINE)
+_REQUIRED_YEARS = re.compile(r'(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?(?:years|yrs)')
+
+_EDUCATION = re.compile(
+    r"\b(?:(?P<level_4>ph\.?\s?d|doctorate|doctoral)"
+    r"|(?P<level_3>master'?s?|m\.?\s?sc|m\.?\s?tech|mba|m\.?\s?eng)"
+    r"|(?P<level_2>bachelor'?s?|b\.?\s?sc|b\.?\s?tech|undergraduate degree)"
+    r"|(?P<level_1>associate'?s? degree|diploma))\b"
+)
+# Two-letter degrees collide with words ("be", "ms"), so they only count
+# dotted or in capitals and are matched case-sensitively on the raw text
+_DEGREE_ABBREVIATION = re.compile(
+    r"\b(?:(?P<level_3>M\.\s?S\.?|MS(?!\s+(?:Office|Excel|Word|SQL|Access|Teams|Project|Azure|Dynamics)\b))"
+    r"|(?P<level_2>B\.\s?[SEA]\.?|B[SEA]))(?![\w'])"
+)
+
+_WORD = re.compile(r'[a-z][a-z+#.]*')
+_TITLE_STOPWORDS = {'a', 'an', 'and', 'the', 'of', 'for', 'in', 'at', 'to', 'with', 'we', 'are', 'is'}
+_TITLE_WORDS = re.compile(
+    r'\b(?:engineer|developer|scientist|analyst|manager|architect|designer|consultant|'
+    r'administrator|lead|director|specialist|intern|programmer)\b'
+)
+
+
+def get_weights(overrides: Optional[Dict] = None) -> Dict[str, float]:
+    """
+    Feature weights from LOCAL_SCORE_WEIGHTS (JSON) with optional overrides
+
+    Args:
+        overrides: Optional weights that take precedence
+
+    Returns:
+        Dictionary of feature name to weight
+    """
+    weights = dict(DEFAULT_WEIGHTS)
+    env_weights = os.getenv("LOCAL_SCORE_WEIGHTS")
+    if env_weights:
+        try:
+            weights.update({k: float(v) for k, v in json.loads(env_weights).items() if k in weights})
+        except (ValueError, AttributeError):
+            pass
+    if overrides:
+        weights.update({k: float(v) for k, v in overrides.items() if k in weights})
+    return weights
+
+
+def _title_tokens(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if word not in _TITLE_STOPWORDS}
+
+
+def _month_index(year: str, month_name: Optional[str], month_num: Optional[str]) -> int:
+    month = 1
+    if month_name:
+        month = _MONTHS.get(month_name[:3].lower(), 1)
+    elif month_num and 1 <= int(month_num) <= 12:
+        month = int(month_num)
+    return int(year) * 12 + month - 1
+
+
+def parse_experience_years(text: str, reference_date: Optional[date] = None) -> float:
+    """
+    Total years covered by date ranges in a resume, with overlaps merged
+
+    Args:
+        text: Resume text
+        reference_date: Date used for open-ended ranges ("Present")
+
+    Returns:
+        Years of experience
+    """
+    reference_date = reference_date or date.today()
+    now = reference_date.year * 12 + reference_date.month - 1
+
+    # Only lines with a year can hold a range; skip the rest cheaply
+    dated_text = "\n".join(_DATED_LINE.findall(text.lower()))
+
+    intervals = []
+    for match in _DATE_RANGE.finditer(dated_text):
+        start = _month_index(match.group('start_year'), match.group('start_month'), match.group('start_num'))
+        if match.group('present'):
+            end = now
+        else:
+            end = _month_index(match.group('end_year'), match.group('end_month'), match.group('end_num'))
+        if start <= end <= now:
+            intervals.append((start, end))
+
+    months = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                months += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        months += current_end - current_start
+
+    return round(months / 12, 1)
+
+
+def parse_education_level(text: str, highest: bool = True) -> int:
+    """
+    Education level mentioned in text (0 none, 1 associate, 2 bachelor, 3 master, 4 doctorate)
+
+    Args:
+        text: Resume or job description text
+        highest: Return the highest level found (resume) or the lowest (JD requirement)
+
+    Returns:
+        Education level
+    """
+    levels = {int(match.lastgroup[-1]) for match in _EDUCATION.finditer(text.lower())}
+    levels.update(int(match.lastgroup[-1]) for match in _DEGREE_ABBREVIATION.finditer(text))
+    if not levels:
+        return 0
+    return max(levels) if highest else min(levels)
+
+
+def prepare_job_description(job_description: str) -> Dict:
+    """
+    Parse the job description once for scoring many resumes
+
+    Args:
+        job_description: Job description text
+
+    Returns:
+        Job profile with skills, required years, title tokens and education level
+    """
+    lines = [line.strip() for line in job_description.splitlines() if line.strip()]
+    title = lines[0] if lines else ""
+    required_years = [int(years) for years in _REQUIRED_YEARS.findall(job_description.lower())]
+
+    return {
+        "skills": extract_skills(job_description),
+        "required_years": min(required_years) if required_years else None,
+        "title": title,
+        "title_tokens": _title_tokens(re.split(r'\s[-–—|]\s', title)[0]) if title else set(),
+        "education_level": parse_education_level(job_description, highest=False),
+    }
+
+
+def _title_lines(text: str) -> List[str]:
+    """Lines of lower-cased text that contain a job-title word"""
+    found = {}
+    for match in _TITLE_WORDS.finditer(text):
+        start = text.rfind("\n", 0, match.start()) + 1
+        if start not in found:
+            end = text.find("\n", match.end())
+            found[start] = text[start:end if end != -1 else len(text)]
+    return list(found.values())
+
+
+def _title_similarity(text: str, lines: List[str], title_tokens: Set[str]) -> float:
+    """Best share of JD title words found in a header line or any title-like line"""
+    if not title_tokens:
+        return 1.0
+    best = 0.0
+    for line in lines[:10] + _title_lines(text):
+        overlap = len(title_tokens & _title_tokens(line)) / len(title_tokens)
+        if overlap > best:
+            best = overlap
+            if best == 1.0:
+                break
+    return best
+
+
+def score_resume(resume: Dict, job_profile: Dict, weights: Optional[Dict] = None,
+                 reference_date: Optional[date] = None) -> Dict:
+    """
+    Score one resume against a prepared job profile
+
+    Args:
+        resume: Dictionary with 'filename' and 'text'
+        job_profile: Result of prepare_job_description
+        weights: Feature weights (defaults to get_weights())
+        reference_date: Date used for open-ended experience ranges
+
+    Returns:
+        Candidate dictionary with 'match_score' and 'score_breakdown'
+    """
+    weights = weights or get_weights()
+    text = resume['text']
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+    jd_skills = job_profile["skills"]
+    resume_skills = set(extract_skills(text))
+    matched = [skill for skill in jd_skills if skill in resume_skills]
+    missing = [skill for skill in jd_skills if skill not in resume_skills]
+    skill_coverage = len(matched) / len(jd_skills) if jd_skills else 1.0
+
+    years = parse_experience_years(text, reference_date)
+    stated_years = [int(value) for value in _REQUIRED_YEARS.findall(text.lower())]
+    if stated_years:
+        years = max(years, float(max(stated_years)))
+    required_years = job_profile["required_years"] or DEFAULT_REQUIRED_YEARS
+    experience = min(1.0, years / required_years)
+
+    title = _title_similarity(text.lower(), lines, job_profile["title_tokens"])
+
+    required_level = job_profile["education_level"]
+    education_level = parse_education_level(text)
+    if required_level == 0:
+        education = 1.0
+    else:
+        education = min(1.0, education_level / required_level)
+
+    features = {
+        "skill_coverage": skill_coverage,
+        "experience": experience,
+        "title": title,
+        "education": education,
+    }
+    total_weight = sum(weights.values()) or 1.0
+    breakdown = {
+        name: {
+            "value": round(value, 3),
+            "weight": weights.get(name, 0.0),
+            "points": round(100 * weights.get(name, 0.0) * value / total_weight, 1),
+        }
+        for name, value in features.items()
+    }
+    match_score = int(round(sum(item["points"] for item in breakdown.values())))
+
+    return {
+        "name": lines[0][:80] if lines else "Unknown",
+        "filename": resume['filename'],
+        "content_hash": resume_key(resume),
+        "match_score": max(0, min(100, match_score)),
+        "summary": (
+            f"Covers {len(matched)}/{len(jd_skills)} required skills with about {years:g} years of "
+            f"experience. Title match {title:.0%}, education match {education:.0%}."
+        ),
+        "missing_skills": missing,
+        "years_experience": years,
+        "score_breakdown": breakdown,
+    }
+
+
+def score_resumes_locally(resume_texts: List[Dict], job_description: str,
+                          weights: Optional[Dict] = None, top_n: Optional[int] = None) -> List[Dict]:
+    """
+    Score and rank resumes without any API calls
+
+    Args:
+        resume_texts: List of dictionaries with 'filename' and 'text'
+        job_description: Job description text
+        weights: Feature weights (defaults to get_weights())
+        top_n: Return only the best N candidates
+
+    Returns:
+        Candidates sorted by match score (ties by filename)
+    """
+    job_profile = prepare_job_description(job_description)
+    weights = weights or get_weights()
+    reference_date = date.today()
+
+    scored = [score_resume(resume, job_profile, weights, reference_date) for resume in resume_texts]
+    scored.sort(key=lambda candidate: (-candidate["match_score"], candidate["filename"]))
+    return scored[:top_n] if top_n else scored
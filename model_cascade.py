@@ -0,0 +1,366 @@
+"""
+Tiered model cascade: a cheap model triages every resume and only the
+shortlist is sent to the expensive model for full analysis
+"""
+import os
+import copy
+import json
+import time
+from typing import List, Dict, Optional, Tuple, Callable
+from request_coalescing import coalesced_analyze_resumes, coalesced_generate_content
+from adaptive_batching import get_controller, run_batches
+from local_scoring import prepare_job_description, score_resume, get_weights
+from gemini_analysis import assign_resume_ids, ANALYSIS_TEXT_CHARS
+from deduplication import resume_key
+
+# Triage model name that selects the deterministic local scorer instead of an API call
+LOCAL_TRIAGE_MODEL = 'local'
+
+# USD per 1K tokens as (input, output). Unknown models are reported at zero cost.
+MODEL_PRICING = {
+    'gemini-1.5-flash': (0.000075, 0.0003),
+    'gemini-1.5-pro': (0.00125, 0.005),
+    'gemini-pro': (0.0005, 0.0015),
+}
+
+# Share of the input rate charged for prompt tokens served from a context cache
+CACHED_INPUT_RATE = 0.25
+
+TRIAGE_TEXT_CHARS = 1200
+
+
+def get_cascade_config(overrides: Optional[Dict] = None) -> Dict:
+    """
+    Build the cascade configuration from environment variables
+
+    Args:
+        overrides: Optional values that take precedence over the environment
+
+    Returns:
+        Cascade configuration dictionary
+    """
+    config = {
+        "enabled": os.getenv("CASCADE_ENABLED", "true").lower() == "true",
+        "triage_model": os.getenv("CASCADE_TRIAGE_MODEL", "gemini-1.5-flash"),
+        "analysis_model": os.getenv("CASCADE_ANALYSIS_MODEL", "gemini-pro"),
+        "shortlist_size": int(os.getenv("CASCADE_SHORTLIST_SIZE", "10")),
+        "min_triage_score": int(os.getenv("CASCADE_MIN_TRIAGE_SCORE", "0")),
+        "triage_batch_size": int(os.getenv("CASCADE_TRIAGE_BATCH_SIZE", "25")),
+        "analysis_batch_size": int(os.getenv("CASCADE_ANALYSIS_BATCH_SIZE", "20")),
+    }
+    if overrides:
+        config.update({key: value for key, value in overrides.items() if value is not None})
+    return config
+
+
+def estimate_cost(model_name: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """
+    Estimate the USD cost of a model call
+
+    Args:
+        model_name: Model used
+        input_tokens: Uncached prompt tokens
+        output_tokens: Response tokens
+        cached_tokens: Prompt tokens served from a context cache
+
+    Returns:
+        Estimated cost in USD
+    """
+    input_rate, output_rate = MODEL_PRICING.get(model_name, (0.0, 0.0))
+    return (
+        (input_tokens + cached_tokens * CACHED_INPUT_RATE) / 1000 * input_rate
+        + output_tokens / 1000 * output_rate
+    )
+
+
+def packed_text_chars(config: Dict, resume_count: int) -> int:
+    """
+    Characters of each resume packed into the first prompt it is sent in
+
+    Args:
+        config: Cascade configuration
+        resume_count: Number of resumes in the run
+
+    Returns:
+        The triage limit when triage will run, otherwise the analysis limit
+    """
+    if config["enabled"] and resume_count > config["shortlist_size"]:
+        return TRIAGE_TEXT_CHARS
+    return ANALYSIS_TEXT_CHARS
+
+
+def create_triage_prefix(job_description: str) -> str:
+    """
+    Create the part of the triage prompt shared by every batch
+
+    Args:
+        job_description: Job description
+
+    Returns:
+        Scoring instructions followed by the job description
+    """
+    return f"""Score how well each resume matches the job description from 0 to 100.
+Return ONLY a JSON array like [{{"index": 1, "score": 72}}], one entry per resume.
+
+JOB DESCRIPTION:
+{job_description}
+"""
+
+
+def create_triage_payload(resume_texts: List[Dict]) -> str:
+    """
+    Create the per-batch resume section of the triage prompt
+
+    Args:
+        resume_texts: List of resume data
+
+    Returns:
+        Resume section of the prompt
+    """
+    resume_data = ""
+    for i, resume in enumerate(resume_texts, 1):
+        resume_data += f"\n[{i}]\n{resume['text'][:TRIAGE_TEXT_CHARS]}\n"
+
+    return f"""
+RESUMES:
+{resume_data}"""
+
+
+def create_triage_prompt(resume_texts: List[Dict], job_description: str) -> str:
+    """
+    Create a terse scoring-only prompt for the triage model
+
+    Args:
+        resume_texts: List of resume data
+        job_description: Job description
+
+    Returns:
+        Formatted prompt string
+    """
+    return create_triage_prefix(job_description) + create_triage_payload(resume_texts)
+
+
+def _triage_entries(response_text: str) -> List[Tuple[int, int]]:
+    """(zero-based index, score) pairs found in a triage reply"""
+    start_idx = response_text.find('[')
+    end_idx = response_text.rfind(']') + 1
+    if start_idx == -1 or end_idx == 0:
+        return []
+
+    try:
+        entries = json.loads(response_text[start_idx:end_idx])
+    except json.JSONDecodeError:
+        return []
+
+    pairs = []
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            pairs.append((int(entry.get("index", 0)) - 1, max(0, min(100, int(entry.get("score", 0))))))
+        except (TypeError, ValueError):
+            continue
+    return pairs
+
+
+def parse_triage_response(response_text: str, count: int) -> List[int]:
+    """
+    Parse triage scores, defaulting resumes missing from the reply to 0
+
+    Args:
+        response_text: Raw response from the triage model
+        count: Number of resumes in the batch
+
+    Returns:
+        List of scores aligned with the batch order
+
+    Raises:
+        Exception: When the reply contains no score for any resume in the batch
+    """
+    scores = [0] * count
+    parsed = 0
+    for index, score in _triage_entries(response_text):
+        if 0 <= index < count:
+            scores[index] = score
+            parsed += 1
+
+    if not parsed:
+        raise Exception("Triage model returned no parseable scores")
+    return scores
+
+
+def _new_tier(tier: str, model_name: str) -> Dict:
+    return {
+        "tier": tier,
+        "model": model_name,
+        "resumes": 0,
+        "calls": 0,
+        "latency_s": 0.0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cached_tokens": 0,
+        "estimated_cost": 0.0,
+        "batch_size": 0,
+        "concurrency": 0.0,
+    }
+
+
+def _record_call(tier: Dict, run_stats: Dict, resumes: int):
+    tier["resumes"] += resumes
+    tier["calls"] += 1
+    tier["latency_s"] += run_stats.get("latency_s", 0.0)
+    tier["input_tokens"] += run_stats.get("input_tokens", 0)
+    tier["output_tokens"] += run_stats.get("output_tokens", 0)
+    tier["cached_tokens"] += run_stats.get("cached_tokens", 0)
+    tier["estimated_cost"] = estimate_cost(
+        tier["model"], tier["input_tokens"], tier["output_tokens"], tier["cached_tokens"]
+    )
+
+
+def _record_controller(tier: Dict, controller):
+    snapshot = controller.snapshot()
+    tier["batch_size"] = snapshot["batch_size"]
+    tier["concurrency"] = snapshot["concurrency"]
+
+
+def triage_resumes(resume_texts: List[Dict], job_description: str, config: Dict, tier: Dict) -> List[int]:
+    """
+    Score every resume with the triage model in adaptively sized, concurrent batches
+    
+    Args:
+        resume_texts: List of resume data
+        job_description: Job description
+        config: Cascade configuration
+        tier: Tier report updated with call statistics
+
+    Returns:
+        List of triage scores aligned with resume_texts
+    """
+    if config["triage_model"] == LOCAL_TRIAGE_MODEL:
+        started = time.perf_counter()
+        job_profile = prepare_job_description(job_description)
+        weights = get_weights()
+        scores = [score_resume(resume, job_profile, weights)["match_score"] for resume in resume_texts]
+        _record_call(tier, {"latency_s": time.perf_counter() - started}, len(resume_texts))
+        return scores
+
+    controller = get_controller(config["triage_model"], config["triage_batch_size"])
+    prefix = create_triage_prefix(job_description)
+
+    def score_batch(batch, run_stats):
+        # Unparseable replies are not shared, so the retry asks the model again
+        response_text = coalesced_generate_content(
+            create_triage_payload(batch), config["triage_model"], run_stats,
+            prefix=prefix, should_store=lambda text: bool(_triage_entries(text))
+        )
+        return parse_triage_response(response_text, len(batch))
+
+    scores = []
+    for batch, batch_scores, run_stats in run_batches(resume_texts, score_batch, controller):
+        scores.extend(batch_scores)
+        _record_call(tier, run_stats, len(batch))
+    _record_controller(tier, controller)
+    return scores
+
+
+def analyze_shortlist(shortlist: List[Dict], job_description: str, config: Dict, tier: Dict,
+                      on_batch: Optional[Callable[[List[Dict], List[Dict]], None]] = None) -> List[Dict]:
+    """
+    Fully analyze the shortlist, splitting it into batches when it is large
+
+    Batch results are merged and the overall top 5 by match score returned.
+
+    Args:
+        shortlist: Resumes selected for full analysis
+        job_description: Job description
+        config: Cascade configuration
+        tier: Tier report updated with call statistics
+        on_batch: Optional function called with (batch, results) as each
+            batch completes
+
+    Returns:
+        List of top candidates with analysis
+    """
+    controller = get_controller(config["analysis_model"], config["analysis_batch_size"])
+
+    def analyze_batch(batch, run_stats):
+        return coalesced_analyze_resumes(batch, job_description, config["analysis_model"], run_stats)
+
+    def batch_done(batch, results, run_stats):
+        # Results may be shared by an identical request, so match them to this batch here
+        assign_resume_ids(results, batch)
+        if on_batch is not None:
+            on_batch(batch, results)
+
+    batches = run_batches(shortlist, analyze_batch, controller, batch_done)
+    for batch, _, run_stats in batches:
+        _record_call(tier, run_stats, len(batch))
+    _record_controller(tier, controller)
+
+    if len(batches) == 1:
+        return batches[0][1]
+
+    merged = [candidate for _, results, _ in batches for candidate in results if isinstance(candidate, dict)]
+    merged.sort(key=lambda candidate: candidate.get("match_score", 0) if isinstance(candidate.get("match_score"), int) else 0, reverse=True)
+    return merged[:5]
+
+
+def analyze_resumes_with_cascade(resume_texts: List[Dict], job_description: str,
+                                 config: Optional[Dict] = None,
+                                 on_progress: Optional[Callable[[str, Dict], None]] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Analyze resumes with a cheap triage tier followed by a full analysis of the shortlist
+
+    Args:
+        resume_texts: List of dictionaries with 'filename' and 'text'
+        job_description: Job description text
+        config: Cascade configuration (see get_cascade_config)
+        on_progress: Optional function called from worker threads with
+            ("triage", tier report and shortlist size) once triage is
+            done and ("batch", that batch's candidates) as each analysis
+            batch completes. Batch candidates are copies and may not all
+            make the final top 5.
+
+    Returns:
+        Tuple of (top candidates with analysis, per-tier cost and latency report)
+    """
+    config = config or get_cascade_config()
+    report = []
+    shortlist = resume_texts
+    triage_scores = {}
+
+    if config["enabled"] and len(resume_texts) > config["shortlist_size"]:
+        triage_tier = _new_tier("triage", config["triage_model"])
+        try:
+            scores = triage_resumes(resume_texts, job_description, config, triage_tier)
+        except Exception as e:
+            raise Exception(f"Error in triage analysis: {str(e)}")
+        report.append(triage_tier)
+
+        ranked = sorted(zip(scores, range(len(resume_texts))), key=lambda item: (-item[0], item[1]))
+        shortlist = [
+            resume_texts[index] for score, index in ranked
+            if score >= config["min_triage_score"]
+        ][:config["shortlist_size"]]
+        triage_scores = {resume_key(resume_texts[index]): score for score, index in ranked}
+        if on_progress is not None:
+            on_progress("triage", {"tier": dict(triage_tier), "shortlisted": len(shortlist)})
+
+        if not shortlist:
+            return [], report
+
+    def batch_done(batch, results):
+        for candidate in results:
+            if isinstance(candidate, dict) and candidate.get("content_hash") in triage_scores:
+                candidate["triage_score"] = triage_scores[candidate["content_hash"]]
+        if on_progress is not None:
+            on_progress("batch", {"resumes": len(batch), "candidates": copy.deepcopy(results)})
+
+    analysis_tier = _new_tier("analysis", config["analysis_model"])
+    try:
+        results = analyze_shortlist(shortlist, job_description, config, analysis_tier, batch_done)
+    except Exception as e:
+        raise Exception(f"Error in shortlist analysis: {str(e)}")
+    report.append(analysis_tier)
+
+    return results, report
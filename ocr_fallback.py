@@ -0,0 +1,114 @@
+"""
+OCR fallback for image-only PDF pages
+
+Pages are rendered with pdf2image (poppler) and read with Tesseract in a
+dedicated, bounded process pool so slow OCR jobs never hold up normal
+text extraction. Everything here is optional: when the Python packages or
+the system binaries are missing, ocr_available() returns False.
+"""
+import os
+import shutil
+import threading
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import List, Dict, Optional
+
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", "2"))
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", str(OCR_MAX_WORKERS * 4)))
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+# Callers waiting on an OCR job give up after this many seconds
+OCR_TIMEOUT_SECONDS = float(os.getenv("OCR_TIMEOUT", "300"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending_slots = threading.BoundedSemaphore(OCR_MAX_PENDING)
+
+
+def ocr_available() -> bool:
+    """
+    Check whether the OCR engine and PDF renderer are installed
+
+    Returns:
+        True when pytesseract, pdf2image, tesseract and pdftoppm are all available
+    """
+    return (
+        importlib.util.find_spec("pytesseract") is not None
+        and importlib.util.find_spec("pdf2image") is not None
+        and shutil.which("tesseract") is not None
+        and shutil.which("pdftoppm") is not None
+    )
+
+
+def ocr_pdf_pages(file_path: str, page_numbers: List[int], dpi: int = OCR_DPI,
+                  language: str = OCR_LANGUAGE) -> Dict[int, str]:
+    """
+    OCR selected pages of a PDF (runs inside the OCR worker process)
+
+    The worker owns file_path and deletes it when done.
+
+    Args:
+        file_path: Path to a private copy of the PDF
+        page_numbers: Zero-based page indexes to OCR
+        dpi: Rendering resolution
+        language: Tesseract language code
+
+    Returns:
+        Mapping of page index to recognized text
+    """
+    from pdf2image import convert_from_path
+    import pytesseract
+
+    try:
+        texts = {}
+        for page_number in page_numbers:
+            images = convert_from_path(
+                file_path, dpi=dpi, first_page=page_number + 1, last_page=page_number + 1
+            )
+            texts[page_number] = "\n".join(
+                pytesseract.image_to_string(image, lang=language) for image in images
+            )
+        return texts
+    finally:
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Process-wide OCR worker pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=OCR_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def submit_ocr(file_path: str, page_numbers: List[int], block: bool = True) -> Optional[Future]:
+    """
+    Queue an OCR job on the worker pool
+
+    Blocks when OCR_MAX_PENDING jobs are already queued so a burst of
+    scanned uploads cannot pile up unbounded work and temp files.
+
+    Args:
+        file_path: Path to a private copy of the PDF (deleted by the worker)
+        page_numbers: Zero-based page indexes to OCR
+        block: Wait for a free slot; when False, return None if the queue is full
+
+    Returns:
+        Future resolving to a mapping of page index to text, or None when
+        block is False and the job was not queued (file_path is left alone)
+    """
+    if not _pending_slots.acquire(blocking=block):
+        return None
+    try:
+        future = get_ocr_pool().submit(ocr_pdf_pages, file_path, page_numbers)
+    except Exception:
+        _pending_slots.release()
+        raise
+    future.add_done_callback(lambda _: _pending_slots.release())
+    return future
@@ -0,0 +1,157 @@
+"""
+Context caching for the shared prompt prefix
+
+Every batch of a run sends the same instructions and job description
+followed by different resumes. When the installed google-generativeai
+SDK supports context caching (genai.caching, 0.7+), the prefix is
+uploaded once per model and reused by every batch, so each call only
+sends and pays full price for its resume payload. Older SDKs, models
+without caching support and prefixes below the minimum cache size fall
+back to sending the full prompt (with the stable part first, so models
+with implicit prefix caching can still reuse it).
+"""
+import os
+import time
+import hashlib
+import threading
+from datetime import timedelta
+from typing import Dict, Optional, Any
+import google.generativeai as genai
+
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", "900"))
+# Providers reject caches below a model-specific minimum size
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+
+# Refresh entries this long before the provider expires them
+EXPIRY_MARGIN_SECONDS = 30
+# Wait this long before retrying after a transient creation error (429, network)
+RETRY_AFTER_ERROR_SECONDS = 30
+
+# key -> (cached content handle or None when caching failed, local expiry time)
+_entries: Dict[str, tuple] = {}
+_key_locks: Dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "created": 0, "unsupported": 0, "errors": 0}
+
+
+def is_cache_refusal(error: Exception) -> bool:
+    """
+    Check whether a cache creation error is a permanent refusal
+
+    Invalid arguments (unsupported model, prefix below the minimum size)
+    will fail the same way until the TTL passes. Quota and network errors
+    will not.
+
+    Args:
+        error: Exception raised by CachedContent.create
+
+    Returns:
+        True for refusals
+    """
+    if type(error).__name__ in ("InvalidArgument", "FailedPrecondition", "NotFound"):
+        return True
+    message = str(error).lower()
+    return "400" in message or "invalid argument" in message or "minimum" in message or "too small" in message
+
+
+def _count(stat: str):
+    with _lock:
+        _stats[stat] += 1
+
+
+def _evict_expired(now: float):
+    """Drop expired entries and their idle key locks (caller holds _lock)"""
+    for key, (_, expires_at) in list(_entries.items()):
+        if expires_at <= now:
+            del _entries[key]
+            key_lock = _key_locks.get(key)
+            if key_lock is not None and not key_lock.locked():
+                del _key_locks[key]
+
+
+def context_caching_available() -> bool:
+    """Whether the installed SDK exposes context caching"""
+    return PROMPT_CACHE_ENABLED and hasattr(genai, "caching")
+
+
+def prefix_key(model_name: str, prefix: str) -> str:
+    """Cache key for a model and prompt prefix"""
+    return hashlib.sha256(f"{model_name}\n{prefix}".encode('utf-8')).hexdigest()
+
+
+def _create_cached_content(model_name: str, prefix: str, ttl_seconds: int) -> Any:
+    """Upload the prefix as cached content (provider call)"""
+    model = model_name if model_name.startswith("models/") else f"models/{model_name}"
+    return genai.caching.CachedContent.create(
+        model=model, contents=[prefix], ttl=timedelta(seconds=ttl_seconds)
+    )
+
+
+def _model_from_cache(cached_content: Any) -> Any:
+    """GenerativeModel bound to cached content (provider call)"""
+    return genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+
+
+def get_prefix_model(model_name: str, prefix: str) -> Optional[Any]:
+    """
+    Get a model bound to a cached copy of the prefix, creating it on first use
+
+    Concurrent batches for the same prefix wait for one creation call.
+    Refusals (unsupported model, prefix too small) are remembered for the
+    TTL so they are not retried on every batch. Other errors are retried
+    after RETRY_AFTER_ERROR_SECONDS.
+
+    Args:
+        model_name: Gemini model to use
+        prefix: Shared prompt prefix (instructions and job description)
+
+    Returns:
+        GenerativeModel using the cached prefix, or None to send the full prompt
+    """
+    if not context_caching_available() or len(prefix) // 4 < PROMPT_CACHE_MIN_TOKENS:
+        return None
+
+    key = prefix_key(model_name, prefix)
+    with _lock:
+        _evict_expired(time.time())
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _lock:
+            cached_content, expires_at = _entries.get(key, (None, 0.0))
+        if time.time() >= expires_at:
+            try:
+                cached_content = _create_cached_content(model_name, prefix, PROMPT_CACHE_TTL)
+                expires_at = time.time() + PROMPT_CACHE_TTL - EXPIRY_MARGIN_SECONDS
+                _count("created")
+            except Exception as e:
+                cached_content = None
+                if is_cache_refusal(e):
+                    expires_at = time.time() + PROMPT_CACHE_TTL - EXPIRY_MARGIN_SECONDS
+                    _count("unsupported")
+                else:
+                    expires_at = time.time() + RETRY_AFTER_ERROR_SECONDS
+                    _count("errors")
+            with _lock:
+                _entries[key] = (cached_content, expires_at)
+        elif cached_content is not None:
+            _count("hits")
+
+    if cached_content is None:
+        return None
+    return _model_from_cache(cached_content)
+
+
+def get_prompt_cache_stats() -> Dict[str, int]:
+    """Counts of cache reuses, creations, refusals and errors in this process"""
+    with _lock:
+        return dict(_stats)
+
+
+def clear_prompt_cache():
+    """Forget all cached prefixes (provider-side caches expire on their own)"""
+    with _lock:
+        _entries.clear()
+        _key_locks.clear()
+        _stats.update({"hits": 0, "created": 0, "unsupported": 0, "errors": 0})
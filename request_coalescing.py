@@ -0,0 +1,277 @@
+"""
+Single-flight request coalescing for Gemini calls
+
+Concurrent identical requests (same model and prompt) wait on one in-flight
+call and share its result. Within a process this uses a shared future per
+key; across Gunicorn workers on the same host a file lock per key and a
+small on-disk result store make followers reuse the leader's result.
+"""
+import os
+import copy
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Optional, Callable, Any
+from gemini_analysis import (
+    analyze_resumes_with_gemini, generate_content, create_analysis_prompt, DEFAULT_MODEL
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process coalescing only
+    fcntl = None
+
+RESULT_STORE_DIR = os.getenv(
+    "COALESCE_STORE_DIR", os.path.join(tempfile.gettempdir(), "resume_screener_results")
+)
+RESULT_TTL_SECONDS = int(os.getenv("COALESCE_RESULT_TTL", "600"))
+PRUNE_INTERVAL_SECONDS = 300
+
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def request_key(prompt: str, model_name: str) -> str:
+    """
+    Build the coalescing key for a prompt
+
+    Args:
+        prompt: Prompt text
+        model_name: Model the prompt is sent to
+
+    Returns:
+        Hex SHA-256 digest of model and prompt
+    """
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+def _store_path(key: str, suffix: str) -> str:
+    return os.path.join(RESULT_STORE_DIR, f"{key}.{suffix}")
+
+
+def read_stored_result(key: str) -> Optional[Any]:
+    """
+    Read a fresh result from the shared result store
+
+    Args:
+        key: Coalescing key
+
+    Returns:
+        Stored result, or None when missing or expired
+    """
+    path = _store_path(key, "json")
+    try:
+        if time.time() - os.path.getmtime(path) > RESULT_TTL_SECONDS:
+            return None
+        with open(path, 'r', encoding='utf-8') as result_file:
+            return json.load(result_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_stored_result(key: str, result: Any):
+    """
+    Atomically write a result to the shared result store
+
+    Args:
+        key: Coalescing key
+        result: JSON-serializable result
+    """
+    os.makedirs(RESULT_STORE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=RESULT_STORE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as result_file:
+            json.dump(result, result_file)
+        os.replace(tmp_path, _store_path(key, "json"))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def prune_result_store(ttl_seconds: int = RESULT_TTL_SECONDS):
+    """
+    Delete expired results and idle lock files from the shared store
+
+    Lock files are only removed when no process holds them.
+
+    Args:
+        ttl_seconds: Age after which a stored result has expired
+    """
+    cutoff = time.time() - ttl_seconds
+    try:
+        entries = list(os.scandir(RESULT_STORE_DIR))
+    except OSError:
+        return
+
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            if entry.name.endswith(".lock"):
+                if fcntl is None:
+                    continue
+                with open(entry.path, 'a') as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue
+                    os.unlink(entry.path)
+            elif entry.name.endswith((".json", ".tmp")):
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+def _maybe_prune():
+    """Prune the store at most once per PRUNE_INTERVAL_SECONDS in this process"""
+    global _last_prune
+    with _inflight_lock:
+        if time.time() - _last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = time.time()
+    prune_result_store()
+
+
+class _HostLock:
+    """Exclusive per-key file lock shared by processes on the same host"""
+
+    def __init__(self, key: str):
+        self.path = _store_path(key, "lock")
+        self.handle = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            os.makedirs(RESULT_STORE_DIR, exist_ok=True)
+            self.handle = open(self.path, 'a')
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+            # Mark the lock as recently used so pruning leaves it alone
+            os.utime(self.path)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+        return False
+
+
+def single_flight(key: str, fn: Callable[[], Any],
+                  should_store: Optional[Callable[[Any], bool]] = None) -> Any:
+    """
+    Run fn once for all concurrent callers with the same key
+
+    Args:
+        key: Coalescing key
+        fn: Zero-argument function producing a JSON-serializable result
+        should_store: Optional predicate deciding whether the result is
+            written to the shared store (e.g. to skip error fallbacks)
+
+    Returns:
+        Deep copy of the shared result
+    """
+    stored = read_stored_result(key)
+    if stored is not None:
+        return stored
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not leader:
+        return copy.deepcopy(future.result())
+
+    try:
+        with _HostLock(key):
+            # Another worker may have finished while we waited for the lock
+            result = read_stored_result(key)
+            if result is None:
+                result = fn()
+                if should_store is None or should_store(result):
+                    write_stored_result(key, result)
+        future.set_result(result)
+        _maybe_prune()
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+    return copy.deepcopy(result)
+
+
+def _run_coalesced(key: str, fn: Callable[[Dict], Any], run_stats: Optional[Dict],
+                   should_store: Optional[Callable[[Any], bool]] = None) -> Any:
+    """Run fn through single_flight and mark run_stats when the call was shared"""
+    own_stats = {}
+    started = time.perf_counter()
+    result = single_flight(key, lambda: fn(own_stats), should_store)
+
+    if run_stats is not None:
+        if own_stats:
+            run_stats.update(own_stats)
+        else:
+            run_stats.update({
+                "latency_s": time.perf_counter() - started,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "coalesced": True
+            })
+    return result
+
+
+def coalesced_generate_content(prompt: str, model_name: str = DEFAULT_MODEL,
+                               run_stats: Optional[Dict] = None, prefix: Optional[str] = None,
+                               should_store: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    generate_content behind the single-flight layer
+
+    Args:
+        prompt: Prompt text (the variable part when a prefix is given)
+        model_name: Gemini model to use
+        run_stats: Optional dict filled with model, latency and token usage
+        prefix: Optional prompt prefix shared across calls
+        should_store: Optional predicate deciding whether the response is
+            kept in the shared store (e.g. to skip unparseable replies)
+
+    Returns:
+        Response text
+    """
+    key = request_key((prefix or "") + prompt, model_name)
+    return _run_coalesced(
+        key, lambda stats: generate_content(prompt, model_name, stats, prefix=prefix), run_stats, should_store
+    )
+
+
+def coalesced_analyze_resumes(resume_texts: List[Dict], job_description: str,
+                              model_name: str = DEFAULT_MODEL,
+                              run_stats: Optional[Dict] = None) -> List[Dict]:
+    """
+    analyze_resumes_with_gemini behind the single-flight layer
+
+    Args:
+        resume_texts: List of dictionaries with 'filename' and 'text'
+        job_description: Job description text
+        model_name: Gemini model to use
+        run_stats: Optional dict filled with model, latency and token usage
+
+    Returns:
+        List of top candidates with analysis
+    """
+    key = request_key(create_analysis_prompt(resume_texts, job_description), model_name)
+    return _run_coalesced(
+        key,
+        lambda stats: analyze_resumes_with_gemini(resume_texts, job_description, model_name, stats),
+        run_stats,
+        lambda results: not any(
+            isinstance(candidate, dict) and candidate.get("name") == "Analysis Error"
+            for candidate in results
+        )
+    )
@@ -0,0 +1,188 @@
+"""
+Columnar results table utilities for large analysis result sets
+"""
+import os
+import time
+import tempfile
+import importlib.util
+from typing import List, Dict, Iterator, Optional
+import pandas as pd
+
+# Columns shown in the results table and written to exports
+DISPLAY_COLUMNS = {
+    'name': 'Name',
+    'match_score': 'Match Score',
+    'summary': 'Summary',
+    'missing_skills_text': 'Missing Skills',
+}
+
+EXPORT_CHUNK_ROWS = 5000
+
+EXPORT_DIR = os.getenv(
+    "RESULTS_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "resume_screener_exports")
+)
+# Exports left behind by ended sessions are deleted after this long
+EXPORT_TTL_SECONDS = int(os.getenv("RESULTS_EXPORT_TTL", "3600"))
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/octet-stream', 'parquet'),
+}
+
+
+def build_results_frame(results: List[Dict]) -> pd.DataFrame:
+    """
+    Build a columnar DataFrame from candidate results in one pass
+
+    Args:
+        results: List of candidate dictionaries
+
+    Returns:
+        DataFrame with one row per candidate
+    """
+    candidates = [candidate for candidate in results if isinstance(candidate, dict)]
+    df = pd.DataFrame.from_records(
+        candidates,
+        columns=['name', 'filename', 'match_score', 'summary', 'missing_skills', 'duplicate_files', 'score_breakdown']
+    )
+
+    df['name'] = df['name'].fillna('Unknown').astype(str)
+    df['filename'] = df['filename'].fillna('').astype(str)
+    df['summary'] = df['summary'].fillna('No summary available').astype(str)
+    df['match_score'] = pd.to_numeric(df['match_score'], errors='coerce').fillna(0).clip(0, 100).astype('int16')
+    df['missing_skills'] = df['missing_skills'].map(lambda skills: skills if isinstance(skills, list) else [])
+    df['duplicate_files'] = df['duplicate_files'].map(lambda files: files if isinstance(files, list) else [])
+    df['score_breakdown'] = df['score_breakdown'].map(lambda breakdown: breakdown if isinstance(breakdown, dict) else {})
+    df['missing_skills_text'] = df['missing_skills'].map(', '.join)
+
+    # Delimited lower-case key so skill filters are a single vectorized contains
+    df['_skill_key'] = '|' + df['missing_skills'].map(lambda skills: '|'.join(s.lower().strip() for s in skills)) + '|'
+    return df
+
+
+def filter_results_frame(df: pd.DataFrame, min_score: int = 0, max_score: int = 100,
+                         skill: str = "", sort_by: str = 'match_score',
+                         ascending: bool = False) -> pd.DataFrame:
+    """
+    Filter and sort the results frame
+
+    Args:
+        df: Frame from build_results_frame
+        min_score: Lowest match score to keep
+        max_score: Highest match score to keep
+        skill: Hide candidates listed as missing this skill
+        sort_by: Column to sort by
+        ascending: Sort order
+
+    Returns:
+        Filtered and sorted view of the frame
+    """
+    mask = df['match_score'].between(min_score, max_score)
+
+    skill = skill.strip().lower()
+    if skill:
+        mask &= ~df['_skill_key'].str.contains(f"|{skill}|", regex=False)
+
+    view = df[mask]
+    if sort_by in view.columns:
+        view = view.sort_values(sort_by, ascending=ascending, kind='stable')
+    return view
+
+
+def paginate(df: pd.DataFrame, page: int, page_size: int) -> pd.DataFrame:
+    """
+    Return one page of the results frame
+
+    Args:
+        df: Results frame
+        page: Zero-based page number
+        page_size: Rows per page
+
+    Returns:
+        Slice of the frame for the requested page
+    """
+    start = max(0, page) * page_size
+    return df.iloc[start:start + page_size]
+
+
+def page_count(df: pd.DataFrame, page_size: int) -> int:
+    """Number of pages needed to show the frame"""
+    return max(1, -(-len(df) // page_size))
+
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Serialize the display columns to CSV in chunks
+
+    Args:
+        df: Results frame
+        chunk_rows: Rows per chunk
+
+    Yields:
+        CSV text chunks, the first one including the header
+    """
+    export = df[list(DISPLAY_COLUMNS)].rename(columns=DISPLAY_COLUMNS)
+    for start in range(0, max(len(export), 1), chunk_rows):
+        yield export.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0)
+
+
+def parquet_available() -> bool:
+    """Check whether a Parquet engine is installed"""
+    return any(importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet'))
+
+
+def write_export(df: pd.DataFrame, export_format: str = 'csv', directory: Optional[str] = None) -> str:
+    """
+    Write the results to a temporary file without building the whole export in memory
+
+    Args:
+        df: Results frame
+        export_format: 'csv' or 'parquet'
+        directory: Directory for the export file (defaults to EXPORT_DIR)
+
+    Returns:
+        Path to the written file
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    _, extension = EXPORT_FORMATS[export_format]
+    directory = directory or EXPORT_DIR
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=f".{extension}", prefix="resume_results_", dir=directory)
+
+    try:
+        if export_format == 'parquet':
+            os.close(fd)
+            export = df[list(DISPLAY_COLUMNS)].rename(columns=DISPLAY_COLUMNS)
+            export.to_parquet(path, index=False)
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as export_file:
+                for chunk in iter_csv_chunks(df):
+                    export_file.write(chunk)
+    except Exception as e:
+        os.unlink(path)
+        raise Exception(f"Error writing {export_format} export: {str(e)}")
+
+    return path
+
+
+def prune_exports(ttl_seconds: int = EXPORT_TTL_SECONDS, directory: Optional[str] = None):
+    """
+    Delete export files older than the TTL
+
+    Args:
+        ttl_seconds: Maximum age of an export file
+        directory: Export directory (defaults to EXPORT_DIR)
+    """
+    cutoff = time.time() - ttl_seconds
+    try:
+        entries = list(os.scandir(directory or EXPORT_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.name.startswith("resume_results_") and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except OSError:
+            pass
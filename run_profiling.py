@@ -0,0 +1,290 @@
+"""
+Opt-in profiling of a single analysis run
+
+A RunProfiler wraps one process_resumes call with cProfile (calling
+thread), tracemalloc and a wall-clock sampling profiler that walks the
+stacks of every thread, so time spent in batch worker threads shows up
+too. Pipeline stages are timed with profiler.stage(). save() writes one
+zip artifact per run containing:
+
+    report.json     top functions, allocation hot spots, stage wall times
+    profile.pstats  raw cProfile data (snakeviz, pstats)
+    stacks.folded   sampled stacks in folded format (flamegraph.pl, speedscope)
+"""
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import zipfile
+import cProfile
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+PROFILE_ENABLED = os.getenv("PROFILE_ANALYSIS", "false").lower() == "true"
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "resume_screener_profiles")
+)
+PROFILE_TTL_SECONDS = int(os.getenv("PROFILE_TTL", "86400"))
+SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+TOP_N = 30
+TRACEMALLOC_FRAMES = 10
+
+# tracemalloc is process-wide: concurrent profilers share it and the last one out stops it
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            _tracemalloc_owned = not tracemalloc.is_tracing()
+            if _tracemalloc_owned:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc():
+    """Snapshot and peak for the caller; stops tracing when no profiler needs it"""
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        try:
+            snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+            return snapshot, tracemalloc.get_traced_memory()[1]
+        finally:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0 and _tracemalloc_owned and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Background thread that periodically records the stacks of all threads"""
+
+    def __init__(self, interval_ms: float = SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Samples in folded-stack format, one 'frame;frame;frame count' per line"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class RunProfiler:
+    """
+    Profile one analysis run; stage timings are recorded even when disabled
+
+    Profiling failures never propagate into the profiled run. They are
+    recorded in 'error' and the report holds whatever was collected.
+    """
+
+    def __init__(self, enabled: bool = True, label: str = "analysis"):
+        self.enabled = enabled
+        self.label = label
+        self.stages: List[Dict] = []
+        self.started_at: Optional[str] = None
+        self.wall_s = 0.0
+        self.metadata: Dict = {}
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._snapshot = None
+        self._peak_bytes = 0
+        self._started = 0.0
+        self._tracing = False
+        self.error: Optional[str] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._started = time.perf_counter()
+        if not self.enabled:
+            return
+        try:
+            _acquire_tracemalloc()
+            self._tracing = True
+            self._sampler = StackSampler()
+            self._sampler.start()
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        except Exception as e:
+            self.error = f"Profiling could not start: {str(e)}"
+            self._profile = None
+            self.stop()
+
+    def stop(self):
+        self.wall_s = time.perf_counter() - self._started
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+            if self._sampler is not None:
+                self._sampler.stop()
+        except Exception as e:
+            self.error = self.error or f"Profiling failed: {str(e)}"
+        finally:
+            if self._tracing:
+                self._tracing = False
+                try:
+                    self._snapshot, self._peak_bytes = _release_tracemalloc()
+                except Exception as e:
+                    self.error = self.error or f"Profiling failed: {str(e)}"
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time one pipeline stage
+
+        Args:
+            name: Stage name shown in the report
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append({"stage": name, "wall_s": round(time.perf_counter() - started, 4)})
+
+    def top_functions(self, limit: int = TOP_N) -> List[Dict]:
+        """Functions with the highest cumulative time in the calling thread"""
+        if self._profile is None:
+            return []
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, calls, own_time, cumulative, _) in stats.stats.items():
+            rows.append({
+                "function": f"{function} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "own_s": round(own_time, 4),
+                "cumulative_s": round(cumulative, 4),
+            })
+        rows.sort(key=lambda row: row["cumulative_s"], reverse=True)
+        return rows[:limit]
+
+    def allocation_hot_spots(self, limit: int = TOP_N) -> List[Dict]:
+        """Source lines holding the most memory at the end of the run"""
+        if self._snapshot is None:
+            return []
+        snapshot = self._snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        return [
+            {
+                "location": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics('lineno')[:limit]
+        ]
+
+    def report(self) -> Dict:
+        """Summary of the run suitable for JSON"""
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "wall_s": round(self.wall_s, 4),
+            "metadata": self.metadata,
+            "stages": self.stages,
+            "top_functions": self.top_functions(),
+            "allocations": self.allocation_hot_spots(),
+            "peak_memory_mb": round(self._peak_bytes / (1024 * 1024), 2),
+            "samples": self._sampler.samples if self._sampler else 0,
+            "sample_interval_ms": SAMPLE_INTERVAL_MS,
+            "error": self.error,
+        }
+
+    def save(self, directory: Optional[str] = None) -> str:
+        """
+        Write the run artifact (zip with report, pstats and folded stacks)
+
+        Args:
+            directory: Output directory (defaults to PROFILE_DIR)
+
+        Returns:
+            Path to the artifact
+        """
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(
+            suffix=".zip", prefix=f"profile_{datetime.now():%Y%m%d_%H%M%S}_", dir=directory
+        )
+
+        with os.fdopen(fd, 'wb') as artifact_file, zipfile.ZipFile(artifact_file, 'w', zipfile.ZIP_DEFLATED) as artifact:
+            artifact.writestr("report.json", json.dumps(self.report(), indent=2))
+            if self._profile is not None:
+                pstats_path = path + ".pstats"
+                try:
+                    self._profile.dump_stats(pstats_path)
+                    artifact.write(pstats_path, "profile.pstats")
+                finally:
+                    os.unlink(pstats_path)
+            if self._sampler is not None:
+                artifact.writestr("stacks.folded", self._sampler.folded())
+
+        return path
+
+
+def prune_profiles(ttl_seconds: int = PROFILE_TTL_SECONDS, directory: Optional[str] = None):
+    """
+    Delete profile artifacts older than the TTL
+
+    Args:
+        ttl_seconds: Maximum age of an artifact
+        directory: Profile directory (defaults to PROFILE_DIR)
+    """
+    cutoff = time.time() - ttl_seconds
+    try:
+        entries = list(os.scandir(directory or PROFILE_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.name.startswith("profile_") and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except OSError:
+            pass
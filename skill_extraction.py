@@ -0,0 +1,149 @@
+"""
+Skill extraction from resume and job description text
+"""
+import re
+from typing import List, Dict
+
+# Canonical skill name -> aliases matched in text (case-insensitive)
+SKILL_ALIASES: Dict[str, List[str]] = {
+    "Python": ["python"],
+    "Java": ["java"],
+    "JavaScript": ["javascript", "js", "ecmascript"],
+    "TypeScript": ["typescript"],
+    "Go": ["golang"],
+    "Rust": ["rust"],
+    "C++": ["c++", "cpp"],
+    "C#": ["c#", "csharp"],
+    ".NET": [".net", "dotnet"],
+    "Ruby": ["ruby"],
+    "PHP": ["php"],
+    "Scala": ["scala"],
+    "Kotlin": ["kotlin"],
+    "Swift": ["swift"],
+    "R": ["r programming", "rstudio"],
+    "SQL": ["sql"],
+    "Bash": ["bash", "shell scripting"],
+    "PowerShell": ["powershell"],
+    "React": ["react", "react.js", "reactjs"],
+    "Angular": ["angular", "angularjs"],
+    "Vue": ["vue", "vue.js", "vuejs"],
+    "Node.js": ["node.js", "nodejs"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi"],
+    "Spring": ["spring boot", "spring framework"],
+    "HTML": ["html", "html5"],
+    "CSS": ["css", "css3"],
+    "GraphQL": ["graphql"],
+    "REST APIs": ["restful", "rest api", "rest apis"],
+    "PostgreSQL": ["postgresql", "postgres"],
+    "MySQL": ["mysql"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "Oracle": ["oracle"],
+    "Elasticsearch": ["elasticsearch"],
+    "Kafka": ["kafka"],
+    "Spark": ["spark", "pyspark"],
+    "Hadoop": ["hadoop"],
+    "Airflow": ["airflow"],
+    "AWS": ["aws", "amazon web services"],
+    "GCP": ["gcp", "google cloud", "google cloud platform"],
+    "Azure": ["azure"],
+    "Docker": ["docker"],
+    "Kubernetes": ["kubernetes", "k8s"],
+    "Terraform": ["terraform"],
+    "Ansible": ["ansible"],
+    "Jenkins": ["jenkins"],
+    "CI/CD": ["ci/cd", "continuous integration", "continuous delivery"],
+    "Git": ["git", "github", "gitlab"],
+    "Linux": ["linux", "unix"],
+    "Machine Learning": ["machine learning", "ml"],
+    "Deep Learning": ["deep learning"],
+    "NLP": ["nlp", "natural language processing"],
+    "Computer Vision": ["computer vision"],
+    "Data Science": ["data science"],
+    "Statistics": ["statistics", "statistical"],
+    "TensorFlow": ["tensorflow"],
+    "PyTorch": ["pytorch"],
+    "Scikit-learn": ["scikit-learn", "sklearn"],
+    "Pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "Tableau": ["tableau"],
+    "Power BI": ["power bi", "powerbi"],
+    "Excel": ["ms excel", "microsoft excel"],
+    "Agile": ["agile", "scrum"],
+    "Project Management": ["project management"],
+    "Communication": ["communication"],
+    "Leadership": ["leadership", "mentoring", "mentor"],
+}
+
+_ALIAS_TO_SKILL = {
+    alias.lower(): skill for skill, aliases in SKILL_ALIASES.items() for alias in aliases
+}
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Build a regex alternation shaped like a prefix trie
+
+    A flat alternation of ~150 aliases is retried branch by branch at every
+    position; factoring shared prefixes lets the engine reject most
+    positions after one character. Longer continuations are tried first so
+    "spring boot" wins over shorter aliases with the same prefix.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node: Dict) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        optional = '' in node
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if optional:
+            return '(?:' + body + ')?' if len(branches) > 1 or len(body) > 1 else body + '?'
+        return body
+
+    return render(trie)
+
+
+# The lookarounds treat +, # and . as word characters so "C++" and ".NET"
+# match cleanly. Text is lower-cased before matching, which is markedly
+# faster than re.IGNORECASE.
+_SKILL_PATTERN = re.compile(
+    r"(?<![\w+#.])(" + _trie_pattern(list(_ALIAS_TO_SKILL)) + r")(?![\w+#]|\.\w)"
+)
+
+
+def extract_skills(text: str) -> List[str]:
+    """
+    Extract known skills from text
+
+    Args:
+        text: Resume or job description text
+
+    Returns:
+        Sorted list of canonical skill names
+    """
+    if not text:
+        return []
+    found = {_ALIAS_TO_SKILL[match] for match in _SKILL_PATTERN.findall(text.lower())}
+    return sorted(found)
+
+
+def normalize_skill(skill: str) -> str:
+    """
+    Map a skill name or alias to its canonical form
+
+    Args:
+        skill: Skill name as typed by a user or returned by the model
+
+    Returns:
+        Canonical skill name, or the stripped input when unknown
+    """
+    skill = skill.strip()
+    return _ALIAS_TO_SKILL.get(skill.lower(), skill)
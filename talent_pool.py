@@ -0,0 +1,345 @@
+"""
+Persistent candidate talent pool backed by SQLite (with FTS5 full-text search)
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Dict, Optional, Iterable
+from skill_extraction import extract_skills, normalize_skill
+from deduplication import resume_key
+
+TALENT_POOL_DB = os.getenv("TALENT_POOL_DB", "talent_pool.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL,
+    skills TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_updated ON candidates(updated_at);
+
+CREATE TABLE IF NOT EXISTS candidate_skills (
+    skill TEXT NOT NULL COLLATE NOCASE,
+    candidate_id INTEGER NOT NULL REFERENCES candidates(id) ON DELETE CASCADE,
+    PRIMARY KEY (skill, candidate_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS job_descriptions (
+    id INTEGER PRIMARY KEY,
+    jd_hash TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS scores (
+    candidate_id INTEGER NOT NULL REFERENCES candidates(id) ON DELETE CASCADE,
+    jd_id INTEGER NOT NULL REFERENCES job_descriptions(id) ON DELETE CASCADE,
+    match_score INTEGER NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    missing_skills TEXT NOT NULL DEFAULT '[]',
+    scored_at REAL NOT NULL,
+    PRIMARY KEY (candidate_id, jd_id)
+);
+CREATE INDEX IF NOT EXISTS idx_scores_score ON scores(match_score, candidate_id);
+CREATE INDEX IF NOT EXISTS idx_scores_date ON scores(scored_at);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS candidates_fts USING fts5(
+    name, skills, text, content='candidates', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS candidates_ai AFTER INSERT ON candidates BEGIN
+    INSERT INTO candidates_fts(rowid, name, skills, text) VALUES (new.id, new.name, new.skills, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS candidates_ad AFTER DELETE ON candidates BEGIN
+    INSERT INTO candidates_fts(candidates_fts, rowid, name, skills, text) VALUES ('delete', old.id, old.name, old.skills, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS candidates_au AFTER UPDATE ON candidates BEGIN
+    INSERT INTO candidates_fts(candidates_fts, rowid, name, skills, text) VALUES ('delete', old.id, old.name, old.skills, old.text);
+    INSERT INTO candidates_fts(rowid, name, skills, text) VALUES (new.id, new.name, new.skills, new.text);
+END;
+"""
+
+
+def get_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Open the talent pool database, creating the schema if needed
+
+    Args:
+        db_path: Path to the SQLite file (defaults to TALENT_POOL_DB)
+
+    Returns:
+        SQLite connection with row access by column name
+    """
+    conn = sqlite3.connect(db_path or TALENT_POOL_DB, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    try:
+        conn.executescript(FTS_SCHEMA)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: text search falls back to LIKE
+        pass
+    return conn
+
+
+_local = threading.local()
+
+
+def get_thread_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Talent pool connection owned by the calling thread
+
+    Each thread gets its own connection, and so its own transactions.
+    It is closed when the thread exits.
+
+    Args:
+        db_path: Path to the SQLite file (defaults to TALENT_POOL_DB)
+
+    Returns:
+        SQLite connection for this thread
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    path = db_path or TALENT_POOL_DB
+    if path not in connections:
+        connections[path] = get_connection(path)
+    return connections[path]
+
+
+def has_fts(conn: sqlite3.Connection) -> bool:
+    """Check whether the full-text index exists"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'candidates_fts'"
+    ).fetchone()
+    return row is not None
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def save_job_description(conn: sqlite3.Connection, job_description: str) -> int:
+    """
+    Store a job description (once per distinct text)
+
+    Args:
+        conn: Talent pool connection
+        job_description: Job description text
+
+    Returns:
+        Job description id
+    """
+    jd_hash = _hash_text(job_description.strip())
+    conn.execute(
+        "INSERT OR IGNORE INTO job_descriptions (jd_hash, text, created_at) VALUES (?, ?, ?)",
+        (jd_hash, job_description, time.time())
+    )
+    return conn.execute("SELECT id FROM job_descriptions WHERE jd_hash = ?", (jd_hash,)).fetchone()["id"]
+
+
+def save_candidate(conn: sqlite3.Connection, resume: Dict, name: str = "") -> int:
+    """
+    Insert or refresh a candidate and their parsed skills
+
+    Args:
+        conn: Talent pool connection
+        resume: Dictionary with 'filename', 'text' and optional 'content_hash'
+        name: Candidate name when known
+
+    Returns:
+        Candidate id
+    """
+    key = resume.get('content_hash') or _hash_text(resume['text'])
+    skills = extract_skills(resume['text'])
+    now = time.time()
+
+    conn.execute(
+        """
+        INSERT INTO candidates (content_hash, filename, name, text, skills, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(content_hash) DO UPDATE SET
+            filename = excluded.filename,
+            name = CASE WHEN excluded.name != '' THEN excluded.name ELSE candidates.name END,
+            updated_at = excluded.updated_at
+        """,
+        (key, resume['filename'], name, resume['text'], ", ".join(skills), now, now)
+    )
+    candidate_id = conn.execute("SELECT id FROM candidates WHERE content_hash = ?", (key,)).fetchone()["id"]
+    conn.executemany(
+        "INSERT OR IGNORE INTO candidate_skills (skill, candidate_id) VALUES (?, ?)",
+        [(skill, candidate_id) for skill in skills]
+    )
+    return candidate_id
+
+
+def save_analysis(conn: sqlite3.Connection, resume_texts: List[Dict], results: List[Dict],
+                  job_description: str) -> int:
+    """
+    Persist every analyzed resume and the scores returned for this job description
+
+    Args:
+        conn: Talent pool connection
+        resume_texts: Resumes that were analyzed
+        results: Candidate results (matched to resumes by 'content_hash',
+            or by 'filename' for results without one)
+        job_description: Job description the results were scored against
+
+    Returns:
+        Number of scores stored
+    """
+    candidates = [candidate for candidate in results if isinstance(candidate, dict)]
+    by_hash = {candidate['content_hash']: candidate for candidate in candidates if candidate.get('content_hash')}
+    by_filename = {
+        candidate['filename']: candidate
+        for candidate in candidates if candidate.get('filename') and not candidate.get('content_hash')
+    }
+
+    stored = 0
+    with conn:
+        jd_id = save_job_description(conn, job_description)
+        now = time.time()
+        for resume in resume_texts:
+            candidate = by_hash.get(resume_key(resume)) or by_filename.get(resume['filename'])
+            candidate_id = save_candidate(conn, resume, candidate.get('name', '') if candidate else '')
+            if candidate is None:
+                continue
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO scores
+                    (candidate_id, jd_id, match_score, summary, missing_skills, scored_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    candidate_id, jd_id, int(candidate.get('match_score', 0) or 0),
+                    candidate.get('summary', ''), json.dumps(candidate.get('missing_skills', [])), now
+                )
+            )
+            stored += 1
+    return stored
+
+
+def _fts_query(text: str) -> str:
+    """Quote user terms so FTS5 treats them as plain tokens"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def search_candidates(conn: sqlite3.Connection, query: str = "", skills: Optional[Iterable[str]] = None,
+                      min_score: Optional[int] = None, max_score: Optional[int] = None,
+                      since: Optional[float] = None, until: Optional[float] = None,
+                      limit: int = 50) -> List[Dict]:
+    """
+    Search the talent pool
+
+    Args:
+        conn: Talent pool connection
+        query: Free-text query over name, skills and resume text
+        skills: Skills every returned candidate must have
+        min_score: Lowest past match score (on any job description)
+        max_score: Highest past match score (on any job description)
+        since: Earliest last-seen time (Unix timestamp)
+        until: Latest last-seen time (Unix timestamp)
+        limit: Maximum number of candidates
+
+    Returns:
+        List of candidate dictionaries with best past score
+    """
+    conditions = []
+    params: List = []
+
+    skills = sorted({normalize_skill(skill) for skill in (skills or []) if skill.strip()})
+    if skills:
+        conditions.append(
+            "c.id IN (SELECT candidate_id FROM candidate_skills WHERE skill IN ({}) "
+            "GROUP BY candidate_id HAVING COUNT(*) = ?)".format(", ".join("?" * len(skills)))
+        )
+        params.extend(skills)
+        params.append(len(skills))
+
+    if min_score is not None or max_score is not None:
+        conditions.append(
+            "c.id IN (SELECT candidate_id FROM scores WHERE match_score BETWEEN ? AND ?)"
+        )
+        params.extend([min_score if min_score is not None else 0, max_score if max_score is not None else 100])
+
+    if since is not None:
+        conditions.append("c.updated_at >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("c.updated_at <= ?")
+        params.append(until)
+
+    query = query.strip()
+    if query:
+        if has_fts(conn):
+            conditions.append("c.id IN (SELECT rowid FROM candidates_fts WHERE candidates_fts MATCH ?)")
+            params.append(_fts_query(query))
+        else:
+            conditions.append("(c.text LIKE ? OR c.name LIKE ?)")
+            params.extend([f"%{query}%"] * 2)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = conn.execute(
+        f"""
+        SELECT c.id, c.filename, c.name, c.skills, c.updated_at,
+               MAX(s.match_score) AS best_score, MAX(s.scored_at) AS last_scored_at
+        FROM candidates c
+        LEFT JOIN scores s ON s.candidate_id = c.id
+        {where}
+        GROUP BY c.id
+        ORDER BY best_score IS NULL, best_score DESC, c.updated_at DESC
+        LIMIT ?
+        """,
+        params + [limit]
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def match_job_description(conn: sqlite3.Connection, job_description: str, limit: int = 20) -> List[Dict]:
+    """
+    Rank existing candidates by overlap with the skills in a job description
+
+    Args:
+        conn: Talent pool connection
+        job_description: New job description text
+        limit: Maximum number of candidates
+
+    Returns:
+        List of candidate dictionaries with 'matched_skills' and 'skill_coverage'
+    """
+    jd_skills = extract_skills(job_description)
+    if not jd_skills:
+        return []
+
+    rows = conn.execute(
+        """
+        SELECT c.id, c.filename, c.name, c.skills, c.updated_at,
+               COUNT(*) AS matched_skills,
+               (SELECT MAX(match_score) FROM scores WHERE candidate_id = c.id) AS best_score
+        FROM candidate_skills cs
+        JOIN candidates c ON c.id = cs.candidate_id
+        WHERE cs.skill IN ({})
+        GROUP BY c.id
+        ORDER BY matched_skills DESC, best_score DESC, c.updated_at DESC
+        LIMIT ?
+        """.format(", ".join("?" * len(jd_skills))),
+        jd_skills + [limit]
+    ).fetchall()
+
+    candidates = []
+    for row in rows:
+        candidate = dict(row)
+        candidate['skill_coverage'] = round(candidate['matched_skills'] / len(jd_skills), 2)
+        candidates.append(candidate)
+    return candidates
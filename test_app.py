@@ -4,6 +4,8 @@ Test script for the AI-Powered Resume Screener
 import os
 import sys
 import tempfile
+import json
+import time
 from text_extraction import extract_text_from_file, extract_text_from_pdf, extract_text_from_docx
 
 def test_text_extraction():
@@ -40,6 +42,709 @@ def test_text_extraction():
     except Exception as e:
         print(f"✗ DOCX extraction test failed: {e}")
 
+def _write_test_docx(path):
+    """Write a minimal DOCX with a header, paragraph, table and text box"""
+    import zipfile
+    w = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+    mc = 'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+    textbox = '<w:txbxContent><w:p><w:r><w:t>Skills: Python, Docker</w:t></w:r></w:p></w:txbxContent>'
+    document = (
+        f'<w:document {w} {mc}><w:body>'
+        '<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr>'
+        '<w:r><w:t>Software</w:t><w:tab/><w:t xml:space="preserve">Engineer</w:t></w:r></w:p>'
+        f'<w:p><w:r><mc:AlternateContent><mc:Choice>{textbox}</mc:Choice>'
+        f'<mc:Fallback>{textbox}</mc:Fallback></mc:AlternateContent></w:r></w:p>'
+        '<w:tbl><w:tr><w:tc><w:p><w:r><w:t>AWS</w:t></w:r></w:p></w:tc>'
+        '<w:tc><w:p><w:r><w:t>5 years</w:t></w:r></w:p></w:tc></w:tr></w:tbl>'
+        '</w:body></w:document>'
+    )
+    header = f'<w:hdr {w}><w:p><w:r><w:t>Jane Doe</w:t></w:r></w:p></w:hdr>'
+    with zipfile.ZipFile(path, 'w') as package:
+        package.writestr('word/document.xml', document)
+        package.writestr('word/header1.xml', header)
+
+def test_docx_stream_extraction():
+    """Test DOCX extraction of headers, tables and text boxes"""
+    print("Testing DOCX stream extraction...")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "resume.docx")
+        _write_test_docx(path)
+        text = extract_text_from_docx(path)
+    
+    assert text.split("\n") == [
+        "Jane Doe",
+        "Software\tEngineer",
+        "Skills: Python, Docker",
+        "",
+        "AWS\t5 years",
+    ]
+    print("✓ DOCX stream extraction test passed")
+
+def test_extraction_cache():
+    """Test streaming ingestion into the extraction cache"""
+    print("Testing extraction cache...")
+    import io
+    import extraction_cache
+    
+    original_dir = extraction_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        extraction_cache.CACHE_DIR = os.path.join(tmp_dir, "cache")
+        try:
+            path = os.path.join(tmp_dir, "resume.docx")
+            _write_test_docx(path)
+            with open(path, 'rb') as docx_file:
+                entry = extraction_cache.ingest_file("resume.docx", docx_file, chunk_size=64)
+            
+            assert entry['error'] is None
+            assert entry['size'] == os.path.getsize(path)
+            assert "Jane Doe" in extraction_cache.get_cached_text(entry['content_hash'])
+            
+            bad = extraction_cache.ingest_file("broken.pdf", io.BytesIO(b"not a pdf"))
+            assert bad['error'] and extraction_cache.get_cached_text(bad['content_hash']) is None
+            
+            extraction_cache.prune_cache(max_bytes=0)
+            assert extraction_cache.get_cached_text(entry['content_hash']) is None
+        finally:
+            extraction_cache.CACHE_DIR = original_dir
+    print("✓ Extraction cache test passed")
+
+def test_ocr_fallback():
+    """Test that image-only PDF pages are sent to OCR and merged into the cache"""
+    print("Testing OCR fallback...")
+    from concurrent.futures import Future
+    from PyPDF2 import PdfWriter
+    import extraction_cache
+    from text_extraction import extract_pages_from_pdf, find_empty_pages
+    
+    submitted = []
+    queue_full = []
+    def fake_submit(file_path, page_numbers, block=True):
+        if queue_full and not block:
+            return None
+        submitted.append(page_numbers)
+        os.unlink(file_path)
+        future = Future()
+        future.set_result({page: f"Scanned page {page}" for page in page_numbers})
+        return future
+    
+    original = (extraction_cache.CACHE_DIR, extraction_cache.submit_ocr, extraction_cache.ocr_available)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        extraction_cache.CACHE_DIR = os.path.join(tmp_dir, "cache")
+        try:
+            path = os.path.join(tmp_dir, "scan.pdf")
+            writer = PdfWriter()
+            writer.add_blank_page(width=612, height=792)
+            writer.add_blank_page(width=612, height=792)
+            with open(path, 'wb') as pdf_file:
+                writer.write(pdf_file)
+            
+            pages = extract_pages_from_pdf(path)
+            assert find_empty_pages(pages) == [0, 1]
+            
+            extraction_cache.ocr_available = lambda: False
+            with open(path, 'rb') as pdf_file:
+                entry = extraction_cache.ingest_file("scan.pdf", pdf_file)
+            assert entry['ocr'] == 'unavailable' and entry['chars'] == 0
+            
+            extraction_cache.prune_cache(max_bytes=0)
+            extraction_cache.ocr_available = lambda: True
+            extraction_cache.submit_ocr = fake_submit
+            with open(path, 'rb') as pdf_file:
+                entry = extraction_cache.ingest_file("scan.pdf", pdf_file)
+            assert entry['ocr'] == 'pending' and submitted == [[0, 1]]
+            
+            entry = extraction_cache.complete_ocr(entry)
+            assert entry['ocr'] == 'done' and entry['error'] is None
+            assert "Scanned page 1" in extraction_cache.get_cached_text(entry['content_hash'])
+            
+            # Re-uploads hit the cache instead of running OCR again
+            with open(path, 'rb') as pdf_file:
+                again = extraction_cache.ingest_file("scan_copy.pdf", pdf_file)
+            assert again['ocr'] == 'done' and len(submitted) == 1
+            
+            # With the queue full a scan is deferred rather than blocking ingestion
+            writer.add_blank_page(width=612, height=792)
+            with open(path, 'wb') as pdf_file:
+                writer.write(pdf_file)
+            queue_full.append(True)
+            with open(path, 'rb') as pdf_file:
+                deferred = extraction_cache.ingest_file("scan3.pdf", pdf_file, block_on_ocr=False)
+            assert deferred['ocr'] == 'pending' and len(submitted) == 1
+            deferred = extraction_cache.complete_ocr(deferred, timeout=5)
+            assert deferred['ocr'] == 'done' and submitted[-1] == [0, 1, 2]
+            assert "Scanned page 2" in extraction_cache.get_cached_text(deferred['content_hash'])
+        finally:
+            extraction_cache.CACHE_DIR, extraction_cache.submit_ocr, extraction_cache.ocr_available = original
+    print("✓ OCR fallback test passed")
+
+def test_text_normalization():
+    """Test header/footer, hyphenation, bullet and boilerplate removal"""
+    print("Testing text normalization...")
+    from text_extraction import PAGE_BREAK
+    from text_normalization import normalize_text, normalize_resumes
+    
+    pages = [
+        "Jane Doe - Resume\nJane Doe\n123 Main Street, Apt 4 | jane@example.com | 555-123-4567\n"
+        "EXPERIENCE\n•  Built data pipe-\nlines in Python\n●Led a team of 5\nPage 1 of 2",
+        "Jane Doe - Resume\n▪ Shipped REST APIs\nREFERENCES\nJohn Smith, 45 Oak Avenue\n"
+        "EDUCATION\nB.S. Computer Science\nReferences available upon request.\nPage 2 of 2",
+    ]
+    text = normalize_text(PAGE_BREAK.join(pages))
+    
+    assert text.count("Jane Doe - Resume") == 1
+    assert "jane@example.com | 555-123-4567" in text and "Main Street" not in text
+    assert "- Built data pipelines in Python" in text
+    assert "- Led a team of 5" in text and "- Shipped REST APIs" in text
+    assert "Page" not in text and "John Smith" not in text and "upon request" not in text
+    assert "EDUCATION\nB.S. Computer Science" in text
+    
+    # Single-page text without noise is left alone
+    assert normalize_text("Bob Lee\nJava developer") == "Bob Lee\nJava developer"
+    
+    # A references block ends at any heading-like line, not only known section names
+    text = normalize_text("REFERENCES\nJohn Smith\nCERTIFICATIONS & TRAINING\nAWS Certified\n"
+                          "WORK HISTORY\nGlobex 2015-2019\nReferences:\nJane Roe\nVolunteer work:\nFood bank")
+    assert text == "CERTIFICATIONS & TRAINING\nAWS Certified\nWORK HISTORY\nGlobex 2015-2019\nVolunteer work:\nFood bank"
+    text = normalize_text("Jane\nReferences\nBob Smith, Acme\nEmployment History\nAcme 2015 - 2020\nAchievements\nWon award")
+    assert text == "Jane\nEmployment History\nAcme 2015 - 2020\nAchievements\nWon award"
+    
+    # Bare numbers are only page numbers at the top or bottom of a page
+    text = normalize_text("Jane Doe\nData Engineer\nSummary\nTeam size\n10\nServers\n100\nSkills\nPython\nSQL\n2")
+    assert "\n10\n" in text and "\n100\n" in text and not text.endswith("2")
+    
+    normalized, report = normalize_resumes([{'filename': 'jane.pdf', 'text': PAGE_BREAK.join(pages)}])
+    assert normalized[0]['text'] == normalize_text(PAGE_BREAK.join(pages)) and normalized[0]['filename'] == 'jane.pdf'
+    assert report[0]['tokens_saved'] > 0
+    assert report[0]['tokens_before'] - report[0]['tokens_after'] == report[0]['tokens_saved']
+    
+    # Savings are counted on the part of the text that is packed into the prompt
+    long_text = "Python developer building data pipe-\nlines " * 200
+    _, report = normalize_resumes([{'filename': 'long.pdf', 'text': long_text}], packed_chars=100)
+    assert report[0]['tokens_before'] == 25 and report[0]['tokens_saved'] == 0
+    print("✓ Text normalization test passed")
+
+def test_deduplication():
+    """Test exact and near-duplicate resume detection"""
+    print("Testing resume deduplication...")
+    from deduplication import deduplicate_resumes, attach_duplicate_results
+    
+    base = " ".join(f"Worked on project {i} using Python and Docker." for i in range(40))
+    resumes = [
+        {'filename': 'a.pdf', 'text': "Jane Doe\n" + base},
+        {'filename': 'a_copy.pdf', 'text': "Jane Doe\n" + base},
+        {'filename': 'a_agency.pdf', 'text': "Jane  Doe " + base + " Submitted via agency."},
+        {'filename': 'b.pdf', 'text': "Bob Lee\nTen years of Java, Spring and Oracle experience in banking."},
+    ]
+    
+    unique, duplicates = deduplicate_resumes(resumes)
+    assert [r['filename'] for r in unique] == ['a.pdf', 'b.pdf']
+    assert sorted(duplicates[unique[0]['content_hash']]) == ['a_agency.pdf', 'a_copy.pdf']
+    
+    # Results are tied to resumes by prompt number, not by the (shared) filename
+    from gemini_analysis import assign_resume_ids
+    batch = [{'filename': 'resume.pdf', 'text': unique[1]['text']}, {'filename': 'resume.pdf', 'text': unique[0]['text']}]
+    results = assign_resume_ids([
+        {'name': 'Jane Doe', 'filename': 'resume.pdf', 'resume_number': 2},
+        {'name': 'Bob Lee', 'filename': 'resume.pdf', 'resume_number': 1},
+    ], batch)
+    results = attach_duplicate_results(results, duplicates)
+    assert results[0]['content_hash'] == unique[0]['content_hash'] and 'resume_number' not in results[0]
+    assert sorted(results[0]['duplicate_files']) == ['a_agency.pdf', 'a_copy.pdf']
+    assert results[1]['duplicate_files'] == []
+    
+    # Signatures of cached files are stored next to their text and reused
+    import extraction_cache
+    from deduplication import minhash_signature, resume_signature
+    original_dir = extraction_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as cache_dir:
+        extraction_cache.CACHE_DIR = cache_dir
+        try:
+            extraction_cache.put_cached_text("f" * 64, resumes[0]['text'])
+            resume = {'filename': 'a.pdf', 'text': resumes[0]['text'], 'content_hash': "f" * 64}
+            signature = resume_signature(resume)
+            assert (signature == minhash_signature(resumes[0]['text'])).all()
+            assert (resume_signature({**resume, 'text': ""}) == signature).all()
+            extraction_cache.prune_cache(0)
+            assert os.listdir(cache_dir) == []
+        finally:
+            extraction_cache.CACHE_DIR = original_dir
+    print("✓ Deduplication test passed")
+
+def test_results_table():
+    """Test the columnar results table and chunked export"""
+    print("Testing results table...")
+    from results_table import build_results_frame, filter_results_frame, paginate, write_export, prune_exports
+    
+    results = [
+        {'name': f"Candidate {i}", 'match_score': i, 'summary': "", 'missing_skills': ['Docker'] if (i // 10) % 2 == 0 else []}
+        for i in range(0, 100, 10)
+    ] + [{'name': "Bad Score", 'match_score': "n/a"}]
+    
+    df = build_results_frame(results)
+    assert len(df) == 11
+    
+    view = filter_results_frame(df, min_score=30, skill="docker")
+    assert list(view['match_score']) == [90, 70, 50, 30]
+    assert len(paginate(view, 1, 3)) == 1
+    
+    path = write_export(view, 'csv')
+    try:
+        with open(path) as export_file:
+            lines = export_file.read().splitlines()
+        assert lines[0] == "Name,Match Score,Summary,Missing Skills"
+        assert len(lines) == 5
+    finally:
+        os.unlink(path)
+    
+    with tempfile.TemporaryDirectory() as export_dir:
+        write_export(view, 'csv', export_dir)
+        prune_exports(ttl_seconds=3600, directory=export_dir)
+        assert len(os.listdir(export_dir)) == 1
+        prune_exports(ttl_seconds=-1, directory=export_dir)
+        assert os.listdir(export_dir) == []
+    print("✓ Results table test passed")
+
+def test_model_cascade():
+    """Test that only the triage shortlist reaches the analysis model"""
+    print("Testing model cascade...")
+    import model_cascade
+    
+    resumes = [{'filename': f"r{i}.pdf", 'text': f"Resume {i}"} for i in range(6)]
+    calls = []
+    
+    def fake_generate(prompt, model_name, run_stats=None, prefix=None, should_store=None):
+        calls.append(model_name)
+        run_stats.update({'latency_s': 0.1, 'input_tokens': 1000, 'output_tokens': 100})
+        return json.dumps([{'index': i + 1, 'score': i * 10} for i in range(6)])
+    
+    def unparseable_generate(prompt, model_name, run_stats=None, prefix=None, should_store=None):
+        assert should_store("I cannot score these resumes.") is False
+        return "I cannot score these resumes."
+    
+    def fake_analyze(shortlist, job_description, model_name, run_stats=None):
+        calls.append(model_name)
+        run_stats.update({'latency_s': 1.0, 'input_tokens': 2000, 'output_tokens': 500})
+        return [{'name': r['text'], 'filename': r['filename'], 'match_score': 90} for r in shortlist]
+    
+    import adaptive_batching
+    original = (model_cascade.coalesced_generate_content, model_cascade.coalesced_analyze_resumes)
+    original_state_dir = adaptive_batching.STATE_DIR
+    model_cascade.coalesced_generate_content, model_cascade.coalesced_analyze_resumes = fake_generate, fake_analyze
+    adaptive_batching.STATE_DIR = tempfile.mkdtemp()
+    adaptive_batching._controllers.clear()
+    try:
+        config = model_cascade.get_cascade_config({
+            'enabled': True, 'triage_model': 'gemini-1.5-flash', 'analysis_model': 'gemini-pro',
+            'shortlist_size': 2, 'min_triage_score': 0
+        })
+        progress = []
+        results, report = model_cascade.analyze_resumes_with_cascade(
+            resumes, "Python developer", config, lambda event, data: progress.append((event, data))
+        )
+        assert [event for event, _ in progress] == ['triage', 'batch']
+        assert progress[0][1]['shortlisted'] == 2
+        assert [c['filename'] for c in progress[1][1]['candidates']] == ['r5.pdf', 'r4.pdf']
+        
+        # A triage reply without scores fails the run instead of shortlisting by upload order
+        model_cascade.coalesced_generate_content = unparseable_generate
+        try:
+            model_cascade.analyze_resumes_with_cascade(resumes, "Python developer", config)
+            assert False, "unparseable triage replies should raise"
+        except Exception as e:
+            assert "no parseable scores" in str(e)
+    finally:
+        model_cascade.coalesced_generate_content, model_cascade.coalesced_analyze_resumes = original
+        adaptive_batching.STATE_DIR = original_state_dir
+        adaptive_batching._controllers.clear()
+    
+    assert calls == ['gemini-1.5-flash', 'gemini-pro']
+    assert [r['filename'] for r in results] == ['r5.pdf', 'r4.pdf']
+    assert results[0]['triage_score'] == 50
+    assert [tier['tier'] for tier in report] == ['triage', 'analysis']
+    assert report[1]['estimated_cost'] > 0
+    print("✓ Model cascade test passed")
+
+def test_prompt_prefix_cache():
+    """Test that batches reuse one cached instructions + JD prefix"""
+    print("Testing prompt prefix caching...")
+    from types import SimpleNamespace
+    import gemini_analysis
+    import prompt_cache
+    
+    created, sent = [], []
+    
+    class FakeModel:
+        def __init__(self, model_name=None, cached_content=None):
+            self.cached_content = cached_content
+        
+        def generate_content(self, prompt):
+            sent.append(prompt)
+            cached = gemini_analysis.estimate_tokens(self.cached_content) if self.cached_content else 0
+            usage = SimpleNamespace(
+                prompt_token_count=cached + gemini_analysis.estimate_tokens(prompt),
+                candidates_token_count=10,
+                cached_content_token_count=cached
+            )
+            return SimpleNamespace(text='[{"name": "A", "filename": "a.pdf", "match_score": 80}]', usage_metadata=usage)
+    
+    def fake_create(model_name, prefix, ttl_seconds):
+        created.append(model_name)
+        return prefix
+    
+    original = (prompt_cache.context_caching_available, prompt_cache._create_cached_content,
+                prompt_cache._model_from_cache, prompt_cache.PROMPT_CACHE_MIN_TOKENS, gemini_analysis.genai)
+    prompt_cache.context_caching_available = lambda: True
+    prompt_cache._create_cached_content = fake_create
+    prompt_cache._model_from_cache = lambda cached_content: FakeModel(cached_content=cached_content)
+    prompt_cache.PROMPT_CACHE_MIN_TOKENS = 1
+    gemini_analysis.genai = SimpleNamespace(GenerativeModel=FakeModel)
+    prompt_cache.clear_prompt_cache()
+    try:
+        jd = "Senior Python Developer\n" + "Build data pipelines with Python, SQL and Airflow. " * 20
+        batches = [[{'filename': f'{b}{i}.pdf', 'text': f"Resume {b}{i}"} for i in range(3)] for b in "ab"]
+        
+        cached_stats = []
+        for batch in batches:
+            stats = {}
+            gemini_analysis.analyze_resumes_with_gemini(batch, jd, 'gemini-1.5-flash', stats)
+            cached_stats.append(stats)
+        assert created == ['gemini-1.5-flash']
+        assert prompt_cache.get_prompt_cache_stats()['hits'] == 1
+        assert all("JOB DESCRIPTION" not in prompt and "RESUME 1" in prompt for prompt in sent)
+        
+        # Transient errors are retried soon; refusals are remembered for the TTL
+        def failing_create(model_name, prefix, ttl_seconds):
+            raise Exception("429 Resource has been exhausted" if "transient" in prefix else "400 Invalid argument")
+        
+        prompt_cache._create_cached_content = failing_create
+        now = time.time()
+        assert prompt_cache.get_prefix_model('gemini-1.5-flash', "transient prefix") is None
+        assert prompt_cache.get_prefix_model('gemini-1.5-flash', "refused prefix") is None
+        expiries = {key: expires_at for key, (_, expires_at) in prompt_cache._entries.items()}
+        assert expiries[prompt_cache.prefix_key('gemini-1.5-flash', "transient prefix")] <= now + prompt_cache.RETRY_AFTER_ERROR_SECONDS + 1
+        assert expiries[prompt_cache.prefix_key('gemini-1.5-flash', "refused prefix")] > now + prompt_cache.RETRY_AFTER_ERROR_SECONDS + 1
+        assert prompt_cache.get_prompt_cache_stats()['errors'] == 1
+        assert prompt_cache.get_prompt_cache_stats()['unsupported'] == 1
+        
+        # Expired entries and their locks are evicted
+        for key, (content, _) in list(prompt_cache._entries.items()):
+            prompt_cache._entries[key] = (content, 0.0)
+        prompt_cache.get_prefix_model('gemini-1.5-flash', "refused prefix")
+        assert list(prompt_cache._entries) == [prompt_cache.prefix_key('gemini-1.5-flash', "refused prefix")]
+        assert len(prompt_cache._key_locks) == 1
+        
+        prompt_cache.context_caching_available = lambda: False
+        uncached_stats = {}
+        gemini_analysis.analyze_resumes_with_gemini(batches[0], jd, 'gemini-1.5-flash', uncached_stats)
+        assert sent[-1] == gemini_analysis.create_analysis_prompt(batches[0], jd)
+        
+        assert cached_stats[1]['cached_tokens'] > 0 and uncached_stats['cached_tokens'] == 0
+        assert cached_stats[1]['input_tokens'] * 3 < uncached_stats['input_tokens']
+    finally:
+        (prompt_cache.context_caching_available, prompt_cache._create_cached_content,
+         prompt_cache._model_from_cache, prompt_cache.PROMPT_CACHE_MIN_TOKENS, gemini_analysis.genai) = original
+        prompt_cache.clear_prompt_cache()
+    print("✓ Prompt prefix caching test passed")
+
+def test_adaptive_batching():
+    """Test AIMD backoff on rate limits and learned-setting persistence"""
+    print("Testing adaptive batching...")
+    import adaptive_batching
+    
+    original_backoff = adaptive_batching.BACKOFF_SECONDS
+    adaptive_batching.BACKOFF_SECONDS = 0.01
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            controller = adaptive_batching.AdaptiveController("fake-model", initial_batch_size=4,
+                                                              initial_concurrency=4, state_dir=state_dir)
+            failures = []
+            
+            def call(batch, run_stats):
+                if not failures:
+                    failures.append(1)
+                    raise Exception("429 Resource has been exhausted")
+                run_stats.update({'latency_s': 0.01 * len(batch), 'input_tokens': 100 * len(batch)})
+                return [item * 2 for item in batch]
+            
+            batches = adaptive_batching.run_batches(list(range(30)), call, controller)
+            assert [value for _, result, _ in batches for value in result] == [i * 2 for i in range(30)]
+            
+            snapshot = controller.snapshot()
+            assert snapshot['rate_limited'] == 1
+            assert snapshot['concurrency'] <= adaptive_batching.MAX_CONCURRENCY
+            assert controller.in_flight == 0
+            assert snapshot['tokens_per_resume'] == 100
+            
+            restored = adaptive_batching.AdaptiveController("fake-model", state_dir=state_dir)
+            assert restored.batch_size == controller.batch_size
+            assert restored.concurrency == snapshot['concurrency']
+            
+            restored.start_call()
+            restored.record_failure(rate_limited=True)
+            assert restored.concurrency == max(1.0, snapshot['concurrency'] / 2)
+            
+            # Boundaries are fixed per run; coalesced calls are not measurements
+            shared = adaptive_batching.AdaptiveController("shared-model", initial_batch_size=5,
+                                                          initial_concurrency=2, state_dir=state_dir)
+            
+            def coalesced_call(batch, run_stats):
+                run_stats.update({'latency_s': 0.0, 'input_tokens': 0, 'coalesced': True})
+                return batch
+            
+            batches = adaptive_batching.run_batches(list(range(10)), coalesced_call, shared)
+            assert [len(batch) for batch, _, _ in batches] == [4, 4, 2]
+            assert shared.calls == 0 and shared.in_flight == 0 and shared.throughput == {}
+            
+            # A failing result callback releases every slot, so later runs still get capacity
+            def failing_callback(batch, value, run_stats):
+                raise TypeError("bad batch result")
+            
+            try:
+                adaptive_batching.run_batches(list(range(10)), coalesced_call, shared, failing_callback)
+                assert False, "callback errors should propagate"
+            except TypeError:
+                pass
+            assert shared.in_flight == 0
+            assert len(adaptive_batching.run_batches(list(range(10)), coalesced_call, shared)) == 3
+    finally:
+        adaptive_batching.BACKOFF_SECONDS = original_backoff
+    print("✓ Adaptive batching test passed")
+
+def test_local_scoring():
+    """Test deterministic local scores and their feature breakdown"""
+    print("Testing local scoring...")
+    from datetime import date
+    from local_scoring import score_resumes_locally, parse_experience_years, parse_education_level, prepare_job_description
+    
+    job_description = "Senior Python Engineer\n5+ years with Python, Docker and AWS. Bachelor's degree required."
+    resumes = [
+        {'filename': 'strong.pdf', 'text': "Ana Lima\nSenior Python Engineer\nAcme, Jan 2016 - Dec 2021: Python, Docker, AWS\nBS Computer Science"},
+        {'filename': 'weak.pdf', 'text': "Ben Ode\nBarista\nCafe, 2020 - 2022"},
+    ]
+    
+    assert parse_experience_years("Acme Jan 2018 - Present\nFoo 03/2015 – 06/2018\nBar 2010 to 2012", date(2024, 1, 1)) == 10.8
+    
+    # Words like "be" or "ms" are not degrees, so they must not lower a Master's requirement
+    assert parse_education_level("I will be a great fit, ms or ba") == 0
+    assert parse_education_level("M.S., Stanford; B.A. Economics") == 3
+    assert prepare_job_description("Engineer\nMaster's required. You will be working in MS Office.")['education_level'] == 3
+    
+    first = score_resumes_locally(resumes, job_description)
+    assert first == score_resumes_locally(resumes, job_description)
+    strong, weak = first
+    assert strong['filename'] == 'strong.pdf' and strong['match_score'] == 100
+    assert weak['missing_skills'] == ['AWS', 'Docker', 'Python']
+    assert set(strong['score_breakdown']) == {'skill_coverage', 'experience', 'title', 'education'}
+    assert weak['match_score'] == round(sum(f['points'] for f in weak['score_breakdown'].values()))
+    
+    weighted = score_resumes_locally(resumes, job_description, weights={'skill_coverage': 0, 'experience': 1, 'title': 0, 'education': 0})
+    assert weighted[1]['match_score'] == 40
+    
+    # Local triage scores by position, so uploads sharing a filename keep their own score
+    from model_cascade import triage_resumes, get_cascade_config, _new_tier
+    same_name = [dict(resume, filename='resume.pdf') for resume in reversed(resumes)]
+    config = get_cascade_config({'triage_model': 'local'})
+    assert triage_resumes(same_name, job_description, config, _new_tier("triage", "local")) == [weak['match_score'], 100]
+    print("✓ Local scoring test passed")
+
+def test_run_profiling():
+    """Test that a profiled run writes a report, pstats and folded stacks"""
+    print("Testing run profiling...")
+    import zipfile
+    from run_profiling import RunProfiler, prune_profiles
+    from local_scoring import score_resumes_locally
+    
+    resumes = [{'filename': f'{i}.pdf', 'text': f"Candidate {i}\nPython developer 2018 - 2023"} for i in range(200)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with RunProfiler(label="test") as profiler:
+            with profiler.stage("local_scoring"):
+                score_resumes_locally(resumes, "Python Developer\n3+ years of Python")
+                time.sleep(0.05)
+        path = profiler.save(tmp_dir)
+        
+        with zipfile.ZipFile(path) as artifact:
+            assert set(artifact.namelist()) == {"report.json", "profile.pstats", "stacks.folded"}
+            report = json.loads(artifact.read("report.json"))
+            stacks = artifact.read("stacks.folded").decode()
+        
+        assert report["stages"][0]["stage"] == "local_scoring" and report["stages"][0]["wall_s"] >= 0.05
+        assert any("score_resume" in row["function"] for row in report["top_functions"])
+        assert report["allocations"] and report["samples"] > 0
+        assert "MainThread;" in stacks
+        
+        # Artifacts past the TTL are pruned, other files in the directory are kept
+        other = os.path.join(tmp_dir, "notes.txt")
+        open(other, 'w').close()
+        prune_profiles(ttl_seconds=3600, directory=tmp_dir)
+        assert os.path.exists(path)
+        old = time.time() - 7200
+        os.utime(path, (old, old))
+        os.utime(other, (old, old))
+        prune_profiles(ttl_seconds=3600, directory=tmp_dir)
+        assert not os.path.exists(path) and os.path.exists(other)
+    
+    disabled = RunProfiler(enabled=False)
+    with disabled:
+        with disabled.stage("noop"):
+            pass
+    assert disabled.report()["top_functions"] == [] and len(disabled.stages) == 1
+    
+    # Overlapping profilers share tracemalloc; the first to stop must not break the second
+    import threading
+    import tracemalloc
+    first, second = RunProfiler(label="first"), RunProfiler(label="second")
+    first.start()
+    worker = threading.Thread(target=second.start)
+    worker.start()
+    worker.join()
+    first.stop()
+    assert tracemalloc.is_tracing()
+    worker = threading.Thread(target=second.stop)
+    worker.start()
+    worker.join()
+    assert first.error is None and second.error is None
+    assert second.report()["allocations"] and not tracemalloc.is_tracing()
+    print("✓ Run profiling test passed")
+
+def test_http_api():
+    """Test job submission, SSE progress and status through the ASGI API"""
+    print("Testing HTTP API...")
+    from starlette.testclient import TestClient
+    import api
+    import extraction_cache
+    
+    original = (api.JOB_STORE_DIR, extraction_cache.CACHE_DIR)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        api.JOB_STORE_DIR = os.path.join(tmp_dir, "jobs")
+        extraction_cache.CACHE_DIR = os.path.join(tmp_dir, "cache")
+        try:
+            path = os.path.join(tmp_dir, "jane.docx")
+            _write_test_docx(path)
+            
+            with TestClient(api.app) as client:
+                assert client.post("/jobs", json={"gcs_uris": ["gs://b/r.pdf"]}).status_code == 400
+                assert client.post("/jobs", json={"job_description": "x", "gcs_uris": ["http://x"]}).status_code == 400
+                response = client.post("/jobs", json={"job_description": "x", "gcs_uris": "http://x"})
+                assert response.status_code == 400 and response.json()["error"] == "Invalid GCS URI: http://x"
+                assert client.post("/jobs", json={"job_description": "x", "gcs_uris": [1]}).status_code == 400
+                
+                with open(path, 'rb') as docx_file, open(path, 'rb') as copy_file:
+                    response = client.post(
+                        "/jobs",
+                        data={"job_description": "Python Developer\n3+ years of Python and Docker",
+                              "scoring_engine": "local", "save_to_pool": "false"},
+                        files=[("files", ("jane.docx", docx_file)), ("files", ("copy.docx", copy_file))]
+                    )
+                assert response.status_code == 202
+                job = response.json()
+                
+                with client.stream("GET", job["events_url"]) as events:
+                    body = "".join(events.iter_text())
+                events = [block for block in body.split("\n\n") if block.startswith("id:")]
+                names = [block.split("\n")[1][len("event: "):] for block in events]
+                assert names.count("file") == 2 and names.count("result") == 1
+                assert names[-1] == "status" and '"done"' in events[-1]
+                
+                status = client.get(job["status_url"]).json()
+                assert status["status"] == "done" and status["error"] is None
+                assert status["results"][0]["filename"] == "jane.docx"
+                assert status["results"][0]["duplicate_files"] == ["copy.docx"]
+                assert client.get("/jobs/unknown").status_code == 404
+                
+                # A late subscriber resuming after event 2 only gets the rest
+                with client.stream("GET", job["events_url"], headers={"Last-Event-ID": "2"}) as events:
+                    assert "id: 2\n" not in "".join(events.iter_text())
+        finally:
+            api.JOB_STORE_DIR, extraction_cache.CACHE_DIR = original
+    print("✓ HTTP API test passed")
+
+def test_request_coalescing():
+    """Test that concurrent identical requests share one call"""
+    print("Testing request coalescing...")
+    import threading
+    import request_coalescing
+    
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+    
+    def slow_call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return [{'name': "Jane Doe", 'match_score': 80}]
+    
+    original_dir = request_coalescing.RESULT_STORE_DIR
+    store_dir = tempfile.TemporaryDirectory()
+    request_coalescing.RESULT_STORE_DIR = store_dir.name
+    try:
+        key = request_coalescing.request_key("same prompt", "gemini-pro")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(request_coalescing.single_flight(key, slow_call)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        assert started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert len(results) == 5 and all(r == results[0] for r in results)
+        assert request_coalescing.single_flight(key, slow_call) == results[0]
+        assert len(calls) == 1
+        
+        # Expired results and idle locks are pruned from the shared store
+        request_coalescing.prune_result_store(ttl_seconds=3600)
+        assert os.listdir(store_dir.name)
+        request_coalescing.prune_result_store(ttl_seconds=-1)
+        assert os.listdir(store_dir.name) == []
+    finally:
+        request_coalescing.RESULT_STORE_DIR = original_dir
+        store_dir.cleanup()
+    print("✓ Request coalescing test passed")
+
+def test_talent_pool():
+    """Test persisting analyses and searching the talent pool"""
+    print("Testing talent pool...")
+    from talent_pool import get_connection, save_analysis, search_candidates, match_job_description
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conn = get_connection(os.path.join(tmp_dir, "pool.db"))
+        resumes = [
+            {'filename': 'jane.pdf', 'text': "Jane Doe. Python, Docker and Kubernetes on AWS."},
+            {'filename': 'bob.pdf', 'text': "Bob Lee. Java and Spring Boot with Oracle."},
+        ]
+        results = [{'name': "Jane Doe", 'filename': 'jane.pdf', 'match_score': 88, 'summary': "", 'missing_skills': []}]
+        assert save_analysis(conn, resumes, results, "Python engineer with Kubernetes") == 1
+        
+        assert [c['name'] for c in search_candidates(conn, skills=["python", "k8s"])] == ["Jane Doe"]
+        assert [c['filename'] for c in search_candidates(conn, query="oracle")] == ["bob.pdf"]
+        assert [c['best_score'] for c in search_candidates(conn, min_score=80, max_score=100)] == [88]
+        assert search_candidates(conn, since=time.time() + 60) == []
+        
+        matches = match_job_description(conn, "Looking for Java and Docker experience")
+        assert {c['filename'] for c in matches} == {'jane.pdf', 'bob.pdf'}
+        assert all(c['skill_coverage'] == 0.5 for c in matches)
+        conn.close()
+        
+        # Each thread gets its own connection (and transaction)
+        import threading
+        from talent_pool import get_thread_connection
+        db_path = os.path.join(tmp_dir, "pool.db")
+        own = get_thread_connection(db_path)
+        assert get_thread_connection(db_path) is own
+        other = []
+        thread = threading.Thread(target=lambda: other.append(get_thread_connection(db_path)))
+        thread.start()
+        thread.join()
+        assert other[0] is not own
+        own.close()
+    print("✓ Talent pool test passed")
+
 def test_imports():
     """Test that all required modules can be imported"""
     print("Testing imports...")
@@ -103,6 +808,34 @@ def main():
     print()
     test_text_extraction()
     print()
+    test_docx_stream_extraction()
+    print()
+    test_extraction_cache()
+    print()
+    test_ocr_fallback()
+    print()
+    test_text_normalization()
+    print()
+    test_deduplication()
+    print()
+    test_results_table()
+    print()
+    test_model_cascade()
+    print()
+    test_prompt_prefix_cache()
+    print()
+    test_adaptive_batching()
+    print()
+    test_local_scoring()
+    print()
+    test_http_api()
+    print()
+    test_run_profiling()
+    print()
+    test_request_coalescing()
+    print()
+    test_talent_pool()
+    print()
     
     print("✅ Test suite completed!")
     print("\nTo run the application:")
@@ -2,9 +2,26 @@
 Text extraction utilities for PDF and DOCX files
 """
 import os
+import re
+import zipfile
 import PyPDF2
 from docx import Document
-from typing import Optional
+from lxml import etree
+from typing import Optional, List
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_P, W_R, W_T, W_TAB, W_BR, W_CR = (W_NS + tag for tag in ('p', 'r', 't', 'tab', 'br', 'cr'))
+W_TBL, W_TR, W_TC = (W_NS + tag for tag in ('tbl', 'tr', 'tc'))
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+DOCX_TEXT_TAGS = [W_P, W_T, W_TAB, W_BR, W_CR, W_TBL, W_TR, W_TC, MC_FALLBACK]
+DOCX_CONTAINER_TAGS = {W_NS + 'body', W_NS + 'hdr'}
+DOCX_HEADER_PART = re.compile(r'^word/header\d*\.xml$')
+
+# Pages with less extracted text than this are treated as image-only
+MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "20"))
+
+# Separator between PDF pages (form feed on its own line) so later stages can see page boundaries
+PAGE_BREAK = "\n\f\n"
 
 def extract_text_from_file(file_path: str) -> str:
     """
@@ -35,31 +52,64 @@ def extract_text_from_pdf(file_path: str) -> str:
     Returns:
         Extracted text content
     """
-    text = ""
+    return PAGE_BREAK.join(extract_pages_from_pdf(file_path)).strip()
+
+def extract_pages_from_pdf(file_path: str) -> List[str]:
+    """
+    Extract text from each page of a PDF file
+    
+    Args:
+        file_path: Path to PDF file
+        
+    Returns:
+        List of page texts in page order
+    """
+    pages = []
     
     try:
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
             
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
+            for page in pdf_reader.pages:
+                pages.append(page.extract_text() or "")
                 
     except Exception as e:
         raise Exception(f"Error reading PDF file: {str(e)}")
     
-    return text.strip()
+    return pages
+
+def find_empty_pages(pages: List[str], min_chars: int = MIN_PAGE_CHARS) -> List[int]:
+    """
+    Find pages that yielded (almost) no text, e.g. scanned images
+    
+    Args:
+        pages: Page texts from extract_pages_from_pdf
+        min_chars: Minimum non-whitespace characters for a page to count as text
+        
+    Returns:
+        Zero-based indexes of empty pages
+    """
+    return [i for i, page in enumerate(pages) if len("".join(page.split())) < min_chars]
 
 def extract_text_from_docx(file_path: str) -> str:
     """
     Extract text from DOCX file
     
+    Stream-parses the headers and word/document.xml straight from the zip,
+    covering paragraphs, tables and text boxes in document order. Falls
+    back to python-docx if the package cannot be parsed directly.
+    
     Args:
         file_path: Path to DOCX file
         
     Returns:
         Extracted text content
     """
+    try:
+        return stream_text_from_docx(file_path)
+    except (KeyError, zipfile.BadZipFile, etree.XMLSyntaxError):
+        pass
+    
     text = ""
     
     try:
@@ -73,6 +123,96 @@ def extract_text_from_docx(file_path: str) -> str:
     
     return text.strip()
 
+def stream_text_from_docx(file_path: str) -> str:
+    """
+    Extract DOCX text by stream-parsing the package XML
+    
+    Args:
+        file_path: Path to DOCX file
+        
+    Returns:
+        Extracted text content
+    """
+    lines = []
+    
+    with zipfile.ZipFile(file_path) as package:
+        header_parts = sorted(name for name in package.namelist() if DOCX_HEADER_PART.match(name))
+        for part in header_parts + ['word/document.xml']:
+            with package.open(part) as xml_stream:
+                lines.extend(_iter_docx_part_lines(xml_stream))
+    
+    return "\n".join(lines).strip()
+
+def _iter_docx_part_lines(xml_stream) -> List[str]:
+    """
+    Collect text lines from one WordprocessingML part
+    
+    Paragraphs become lines, table rows become tab-separated lines and
+    text box paragraphs are emitted where they occur. Only the tags that
+    carry text or structure are reported by the parser, and finished
+    top-level elements are dropped so memory stays flat for large documents.
+    
+    Args:
+        xml_stream: File-like object with the part XML
+        
+    Returns:
+        List of text lines
+    """
+    sinks = [[]]
+    paragraphs = []
+    rows = []
+    fallback_depth = 0
+    
+    for event, elem in etree.iterparse(xml_stream, events=('start', 'end'), tag=DOCX_TEXT_TAGS):
+        tag = elem.tag
+        
+        if event == 'start':
+            if tag == MC_FALLBACK:
+                fallback_depth += 1
+            elif tag == W_P:
+                paragraphs.append([])
+            elif tag == W_TR:
+                rows.append([])
+            elif tag == W_TC:
+                sinks.append([])
+            continue
+        
+        if tag == W_T:
+            if paragraphs and not fallback_depth:
+                paragraphs[-1].append(elem.text or "")
+            continue
+        
+        if tag == MC_FALLBACK:
+            fallback_depth -= 1
+        elif tag == W_P:
+            text = "".join(paragraphs.pop())
+            if not fallback_depth:
+                sinks[-1].append(text)
+        elif tag == W_TC:
+            cell = sinks.pop()
+            rows[-1].append(" ".join(part for part in cell if part))
+        elif tag == W_TR:
+            row = "\t".join(rows.pop())
+            if not fallback_depth:
+                sinks[-1].append(row)
+        elif tag == W_TAB:
+            if paragraphs and not fallback_depth and elem.getparent().tag == W_R:
+                paragraphs[-1].append("\t")
+            continue
+        elif tag in (W_BR, W_CR):
+            if paragraphs and not fallback_depth:
+                paragraphs[-1].append("\n")
+            continue
+        
+        # Drop finished body/header children and everything before them
+        parent = elem.getparent()
+        if parent is not None and parent.tag in DOCX_CONTAINER_TAGS:
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
+    
+    return sinks[0]
+
 def clean_text(text: str) -> str:
     """
     Clean and normalize extracted text
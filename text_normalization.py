@@ -0,0 +1,220 @@
+"""
+Resume text normalization before prompt packing
+
+Raw PDF text carries layout noise that costs prompt tokens without
+telling the model anything: headers and footers repeated on every page,
+page numbers, words hyphenated across line breaks, bullet glyphs,
+reference sections and street addresses. normalize_text() removes it
+with precompiled patterns while keeping one item per line.
+"""
+import re
+import unicodedata
+from typing import List, Dict, Tuple, Optional
+from text_extraction import PAGE_BREAK
+from gemini_analysis import estimate_tokens
+
+# Lines considered for header/footer detection at the top and bottom of each page
+EDGE_LINES = 3
+# Share of pages an edge line must repeat on to count as a header/footer
+REPEAT_SHARE = 0.5
+# Leading lines searched for a street address
+HEADER_LINES = 10
+# Lines up to this long that are all caps, Title Case or end in a colon are treated as headings
+MAX_HEADING_CHARS = 40
+# A references block ends after this many lines even without a heading after it
+MAX_REFERENCE_LINES = 8
+
+_INVISIBLE = re.compile('[\x00\u00ad\u200b\u200c\u200d\u2060\ufeff]')
+_HYPHEN_BREAK = re.compile(r'-(?<=[a-z]-)[ \t]*\n[ \t]*(?=[a-z])')
+_BULLET = re.compile(r'(?:[•●▪■□◦‣∙·○►▸➢➤✓✔\-\*–—](?=\s)|[•●▪■□◦‣∙○►▸➢➤✓✔])\s*')
+_PAGE_NUMBER = re.compile(r'^(?:page\s*)?\d{1,3}(?:\s*(?:/|of)\s*\d{1,3})?$|^-\s*\d{1,3}\s*-$', re.IGNORECASE)
+_SPACES = re.compile(r'[ \t\u00a0]{2,}|[\t\u00a0]')
+_BLANK_LINES = re.compile(r'\n{3,}')
+_DIGITS = re.compile(r'\d+')
+_TITLE_CASE = re.compile(r"^[A-Z][A-Za-z'-]*(?:\s+(?:[A-Z][A-Za-z'-]*|&|and|of|the|for|in))*$")
+
+_REFERENCES_NOTE = re.compile(r'^references?\s+(?:are\s+)?(?:available\s+)?(?:up)?on\s+request\.?$', re.IGNORECASE)
+_REFERENCES_HEADING = re.compile(r'^(?:professional\s+)?references\s*:?$', re.IGNORECASE)
+_SECTION_HEADING = re.compile(
+    r'^(?:work\s+|professional\s+)?(?:experience|employment|education|skills|technical\s+skills|projects|'
+    r'certifications?|awards|publications|summary|profile|languages|interests|volunteer(?:ing)?)\s*:?$',
+    re.IGNORECASE
+)
+# Title-case street addresses ("123 Main Street, Apt 4"), only looked for in the contact header
+_STREET_ADDRESS = re.compile(
+    r'\b\d{1,5}\s+(?:[A-Z0-9][A-Za-z0-9.\'-]*\s+){1,4}'
+    r'(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct|Way|Place|Pl|Terrace|Parkway|Pkwy)\b\.?'
+    r'(?:,?\s*(?:Apt|Apartment|Suite|Ste|Unit|#)\.?\s*[\w-]+)?'
+    r'(?=\s*(?:[,|•·]|$))'
+)
+_DANGLING_SEPARATORS = re.compile(r'^[\s|•·,;]+|[\s|•·,;]+$')
+_DOUBLE_SEPARATORS = re.compile(r'\s*([|•·])(?:\s*[|•·,])+\s*')
+
+
+def _edge_indexes(lines: List[str]) -> List[int]:
+    """Indexes of the first and last EDGE_LINES non-empty lines of a page"""
+    content = [i for i, line in enumerate(lines) if line]
+    return content[:EDGE_LINES] + content[-EDGE_LINES:]
+
+
+def _edge_slots(lines: List[str]) -> Dict[int, Tuple[int, str]]:
+    """Map line index to (position from top or bottom, comparable text) for a page's edge lines"""
+    content = [i for i, line in enumerate(lines) if line]
+    slots = {}
+    for position, i in enumerate(content[:EDGE_LINES]):
+        slots[i] = (position, _DIGITS.sub('#', lines[i].lower()))
+    for position, i in enumerate(reversed(content[-EDGE_LINES:])):
+        slots.setdefault(i, (-1 - position, _DIGITS.sub('#', lines[i].lower())))
+    return slots
+
+
+def _remove_repeated_edges(pages: List[List[str]]) -> List[List[str]]:
+    """Drop header/footer lines repeated in the same position across pages, keeping the first copy"""
+    if len(pages) < 2:
+        return pages
+
+    page_slots = [_edge_slots(lines) for lines in pages]
+    counts = {}
+    for slots in page_slots:
+        for slot in set(slots.values()):
+            counts[slot] = counts.get(slot, 0) + 1
+
+    threshold = max(2, int(len(pages) * REPEAT_SHARE + 0.5))
+    repeated = {slot for slot, count in counts.items() if count >= threshold}
+    if not repeated:
+        return pages
+
+    seen = set()
+    cleaned = []
+    for lines, slots in zip(pages, page_slots):
+        kept = []
+        for i, line in enumerate(lines):
+            slot = slots.get(i)
+            if slot in repeated:
+                if slot in seen:
+                    continue
+                seen.add(slot)
+            kept.append(line)
+        cleaned.append(kept)
+    return cleaned
+
+
+def _is_heading(line: str, title_case: bool = True) -> bool:
+    """Whether a line looks like a section heading (known name, short all-caps, Title Case or 'Title:')"""
+    if _SECTION_HEADING.match(line):
+        return True
+    if not line or len(line) > MAX_HEADING_CHARS:
+        return False
+    if line.endswith(':') or (line.isupper() and line[0].isalpha()):
+        return True
+    return title_case and bool(_TITLE_CASE.match(line))
+
+
+def _clean_line(line: str) -> str:
+    line = line.strip()
+    if line and not line[0].isalnum():
+        line = _BULLET.sub('- ', line, count=1) if _BULLET.match(line) else line
+    return line
+
+
+def _remove_address(line: str) -> str:
+    line = _STREET_ADDRESS.sub('', line)
+    return _DANGLING_SEPARATORS.sub('', _DOUBLE_SEPARATORS.sub(r' \1 ', line))
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize resume text for prompting
+
+    Removes invisible characters, repeated page headers/footers, page
+    numbers, hyphenated line breaks, bullet glyphs, reference sections
+    and street addresses, and collapses whitespace.
+
+    Args:
+        text: Extracted resume text (pages separated by PAGE_BREAK)
+
+    Returns:
+        Normalized text with one item per line
+    """
+    text = unicodedata.normalize('NFKC', _INVISIBLE.sub('', text))
+    text = _SPACES.sub(' ', _HYPHEN_BREAK.sub('', text))
+
+    pages = [
+        [_clean_line(line) for line in page.split('\n')]
+        for page in text.split(PAGE_BREAK.strip('\n'))
+    ]
+    pages = _remove_repeated_edges(pages)
+
+    # Page numbers only count at the top or bottom of a page, so "10" in a list is kept
+    page_numbers = {
+        (page_index, i)
+        for page_index, page in enumerate(pages)
+        for i in _edge_indexes(page)
+        if _PAGE_NUMBER.match(page[i])
+    }
+
+    lines = []
+    reference_lines = None
+    for page_index, page in enumerate(pages):
+        for i, line in enumerate(page):
+            if (page_index, i) in page_numbers:
+                continue
+            if _REFERENCES_HEADING.match(line):
+                reference_lines = 0
+                continue
+            if reference_lines is not None:
+                # A reference name looks like a Title Case heading, so one is not
+                # taken as the end of the block on its first line, and the block is
+                # capped so a missed heading cannot drop the rest of the resume
+                heading = _is_heading(line, title_case=reference_lines > 0)
+                if line and not heading and reference_lines < MAX_REFERENCE_LINES:
+                    reference_lines += 1
+                    continue
+                if line:
+                    reference_lines = None
+                else:
+                    continue
+            if _REFERENCES_NOTE.match(line):
+                continue
+            if len(lines) < HEADER_LINES and _STREET_ADDRESS.search(line):
+                line = _remove_address(line)
+                if not line:
+                    continue
+            lines.append(line)
+
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def normalize_resumes(resume_texts: List[Dict], packed_chars: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Normalize resumes before prompt packing and measure the savings
+
+    Prompts only carry the first packed_chars characters of each resume,
+    so tokens are counted on that part. A resume that fills the window
+    either way shows no savings, though more of its content fits.
+
+    Args:
+        resume_texts: List of dictionaries with 'filename' and 'text'
+        packed_chars: Characters of each resume packed into the prompt
+            (None counts the whole text)
+
+    Returns:
+        Tuple of (resumes with normalized 'text', per-resume savings report)
+    """
+    normalized = []
+    report = []
+    for resume in resume_texts:
+        text = normalize_text(resume['text'])
+        normalized.append({**resume, 'text': text})
+
+        tokens_before = estimate_tokens(resume['text'][:packed_chars])
+        tokens_after = estimate_tokens(text[:packed_chars])
+        report.append({
+            'filename': resume['filename'],
+            'chars_before': len(resume['text']),
+            'chars_after': len(text),
+            'tokens_before': tokens_before,
+            'tokens_after': tokens_after,
+            'tokens_saved': tokens_before - tokens_after,
+        })
+    return normalized, report